@@ -0,0 +1,176 @@
+"""
+builder.py
+
+Fluent builder for module chains
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from datatypes import Assignment, BatchType, CostType, Resource
+from modules import (AssignModule, BatchModule, CreateModule, DecideTwoWayByConditionModule, DelayModule,
+                     DisposeModule, DuplicateModule, Module, ReleaseModule, SeizeModule, SeparateModule)
+
+# branch target given to a branching module: a builder for the branch chain or an already built module
+Branch = Union['ChainBuilder', Module]
+
+
+class ChainBuilder:
+    """
+    Builds a module chain by appending modules in the order entities pass through them, e.g.
+    ChainBuilder().create(...).seize(...).delay(...).release(...).dispose(...).build(). Modules are recorded as
+    specifications and constructed once, from the end of the chain back to its head, when build() is called.
+    """
+
+    def __init__(self):
+        self._specs: List[Tuple[Type[Module], Dict[str, Any]]] = []
+        self._next_module: Optional[Branch] = None
+        self._terminated = False
+        self._built: Optional[Module] = None
+
+    def module(self, module_type: Type[Module], terminal: bool = False, **kwargs) -> ChainBuilder:
+        """
+        Append module of given type, constructed with given keyword arguments and linked to the following module
+        through its next_module field unless terminal
+
+        :param module_type: module class
+        :param terminal: whether the module ends the chain (it has no next_module field)
+        :param kwargs: module fields other than next_module
+        """
+
+        if self._terminated:
+            raise ValueError(f'Unable to append {module_type.__name__} after the end of the module chain.')
+        if self._built is not None:
+            raise ValueError(f'Unable to append {module_type.__name__} to a module chain that was already built.')
+        self._specs.append((module_type, kwargs))
+        self._terminated = terminal
+        return self
+
+    def create(self, name: str, gen_entity_type: str, arrival_generator: Callable[[float, float], np.ndarray],
+               **kwargs) -> ChainBuilder:
+        """
+        Append Create Module; further keyword arguments are passed as module fields
+        """
+
+        return self.module(CreateModule, name=name, gen_entity_type=gen_entity_type,
+                           arrival_generator=arrival_generator, **kwargs)
+
+    def assign(self, name: str, assignments: List[Assignment]) -> ChainBuilder:
+        """
+        Append Assign Module
+        """
+
+        return self.module(AssignModule, name=name, assignments=assignments)
+
+    def seize(self, name: str, resource: Resource, num_resources: int = 1) -> ChainBuilder:
+        """
+        Append Seize Module
+        """
+
+        return self.module(SeizeModule, name=name, resource=resource, num_resources=num_resources)
+
+    def delay(self, name: str, delay_generator: Iterator[float], cost_allocation: CostType = CostType.VALUE_ADDED) -> ChainBuilder:
+        """
+        Append Delay Module
+        """
+
+        return self.module(DelayModule, name=name, delay_generator=delay_generator, cost_allocation=cost_allocation)
+
+    def release(self, name: str, resource: Resource, num_resources: int = 1) -> ChainBuilder:
+        """
+        Append Release Module
+        """
+
+        return self.module(ReleaseModule, name=name, resource=resource, num_resources=num_resources)
+
+    def batch(self, name: str, batch_type: BatchType, batch_size: int, **kwargs) -> ChainBuilder:
+        """
+        Append Batch Module; further keyword arguments are passed as module fields
+        """
+
+        return self.module(BatchModule, name=name, batch_type=batch_type, batch_size=batch_size, **kwargs)
+
+    def separate(self, name: str) -> ChainBuilder:
+        """
+        Append Separate Module
+        """
+
+        return self.module(SeparateModule, name=name)
+
+    def dispose(self, name: str) -> ChainBuilder:
+        """
+        End the chain with a Dispose Module
+        """
+
+        return self.module(DisposeModule, terminal=True, name=name)
+
+    def duplicate(self, name: str, orig: Branch, dup: Branch) -> ChainBuilder:
+        """
+        End the chain with a Duplicate Module
+
+        :param name: module name
+        :param orig: chain the original entity continues to
+        :param dup: chain the duplicate entity continues to
+        """
+
+        return self.module(DuplicateModule, terminal=True, name=name, next_module_orig=orig, next_module_dup=dup)
+
+    def decide(self, name: str, true_next: Branch, false_next: Branch, **kwargs) -> ChainBuilder:
+        """
+        End the chain with a Decide two-way by condition Module
+
+        :param name: module name
+        :param true_next: chain entities meeting the condition continue to
+        :param false_next: chain other entities continue to
+        :param kwargs: condition fields (condition_handler, or cmp_attr, cmp_value and cmp_op)
+        """
+
+        return self.module(DecideTwoWayByConditionModule, terminal=True, name=name, true_next_module=true_next,
+                           false_next_module=false_next, **kwargs)
+
+    def then(self, next_module: Branch) -> ChainBuilder:
+        """
+        End the chain by linking its last module to a module, or chain, shared with other chains
+
+        :param next_module: module or builder of the chain to continue to
+        """
+
+        if self._terminated or not self._specs:
+            raise ValueError('Unable to link a module chain that is empty or already ended.')
+        self._next_module = next_module
+        self._terminated = True
+        return self
+
+    def build(self) -> Module:
+        """
+        Construct the chain's modules and return its head module. A builder is built at most once, so a builder
+        shared by several branches yields a single shared chain.
+        """
+
+        if self._built is not None:
+            return self._built
+        if not self._terminated:
+            raise ValueError('Module chain must end with dispose, duplicate, decide or then.')
+
+        next_module = _resolve(self._next_module)
+        for module_type, kwargs in reversed(self._specs):
+            kwargs = {key: _resolve(val) for key, val in kwargs.items()}
+            if next_module is not None:
+                kwargs['next_module'] = next_module
+            next_module = module_type(**kwargs)
+
+        self._built = next_module
+        return next_module
+
+
+def _resolve(val: Any) -> Any:
+    """
+    Return built head module if given a builder, otherwise the value unchanged
+
+    :param val: builder or value
+    """
+
+    return val.build() if isinstance(val, ChainBuilder) else val
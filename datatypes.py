@@ -6,12 +6,14 @@ Custom type definitions
 
 from __future__ import annotations
 
-import heapq
+import bisect
+import itertools
+import numpy as np
 from uuid import UUID, uuid4
-from itertools import count
-from enum import Enum
+from enum import Enum, IntEnum
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Tuple, Callable, Optional
+from typing import Deque, Dict, List, Tuple, Callable, Iterator, Optional, Union
 
 
 class Unit(Enum):
@@ -21,16 +23,11 @@ class Unit(Enum):
     DAYS = 4
 
 
-class Priority(Enum):
+class Priority(IntEnum):
     LOW = 1
     MEDIUM = 2
     HIGH = 3
 
-    def __lt__(self, other):
-        if self.__class__ is other.__class__:
-            return self.value < other.value
-        return NotImplemented
-
 
 class AssignType(str, Enum):
     VARIABLE = 'VARIABLE'
@@ -51,6 +48,144 @@ class BatchType(Enum):
     ATTRIBUTE = 2
 
 
+ENTITY_METRICS_DTYPE = np.dtype([
+    ('Entity Type', object),
+    ('Value-Added Time', np.float64),
+    ('Non-Value-Added Time', np.float64),
+    ('Wait Time', np.float64),
+    ('Transfer Time', np.float64),
+    ('Other Time', np.float64),
+    ('Created At', np.float64),
+    ('Disposed At', np.float64)
+])
+
+
+class EntityMetrics:
+    """
+    Per-entity metrics held in a preallocated structured array, one record per entity index. Modules update metrics
+    through `columns`, views of each field of the array indexed by entity index, as indexing a field column is much
+    cheaper than indexing a record and then its field.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.records = self.__alloc(max(capacity, 1))
+        self.columns: Dict[str, np.ndarray] = {name: self.records[name] for name in ENTITY_METRICS_DTYPE.names}
+        self.n_records = 0
+        self.n_entities = 0
+
+    @staticmethod
+    def __alloc(n: int) -> np.ndarray:
+        records = np.empty(n, dtype=ENTITY_METRICS_DTYPE)
+        records[:] = (None, 0., 0., 0., 0., 0., np.nan, np.nan)
+        return records
+
+    def __len__(self) -> int:
+        return self.n_entities
+
+    def __getitem__(self, entity_ind: int) -> np.void:
+        return self.records[entity_ind]
+
+    def init_entity(self, entity_ind: int, entity_type: str):
+        """
+        Initialize metrics record for entity, doubling the record array if needed
+
+        :param entity_ind: entity index
+        :param entity_type: entity type
+        """
+
+        if entity_ind >= len(self.records):
+            while entity_ind >= len(self.records):
+                self.records = np.concatenate((self.records, self.__alloc(len(self.records))))
+            self.columns = {name: self.records[name] for name in ENTITY_METRICS_DTYPE.names}
+        self.columns['Entity Type'][entity_ind] = entity_type
+        self.n_records = max(self.n_records, entity_ind + 1)
+        self.n_entities += 1
+
+    def in_use(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return entity indices and metrics records of all initialized entities
+        """
+
+        records = self.records[:self.n_records]
+        initialized = np.not_equal(records['Entity Type'], None)
+        return np.flatnonzero(initialized), records[initialized]
+
+
+class EntityTrace:
+    """
+    Flat log of module exits holding one (entity index, trace label index, exit time) record per exit. When the trace
+    is read, the log is compacted into NumPy arrays sorted by entity index, and the per-entity trace of (label, exit
+    time) pairs for an entity is sliced from them on access.
+    """
+
+    def __init__(self, labels: List[str]):
+        self.labels = labels
+        self.records: List[Tuple[int, int, float]] = []
+        # bound once so modules log exits through a builtin call
+        self.record = self.records.append
+        self.__n_compacted = -1
+
+    def __compact(self):
+        """
+        Compact the records logged since the last access into arrays of label indices and exit times ordered by
+        entity index (stably, so each entity's exits stay in log order), with the offsets of each entity's exits
+        """
+
+        if self.__n_compacted == len(self.records):
+            return
+        self.__n_compacted = len(self.records)
+
+        records = np.array(self.records, dtype=np.float64).reshape(-1, 3)
+        entity_inds = records[:, 0].astype(np.int64)
+        order = np.argsort(entity_inds, kind='stable')
+        self.__label_inds = records[order, 1].astype(np.int64)
+        self.__exit_times = records[order, 2]
+        self.__entity_inds, starts = np.unique(entity_inds[order], return_index=True)
+        self.__offsets = np.append(starts, len(order))
+        # entities are iterated in order of their first exit, matching the order they entered the trace
+        self.__first_exit_order = np.argsort(order[starts], kind='stable')
+
+    def __trace(self, pos: int) -> List[Tuple[str, float]]:
+        """
+        Return the trace of the entity at given position in the sorted entity indices
+
+        :param pos: position of entity
+        """
+
+        start, end = self.__offsets[pos], self.__offsets[pos + 1]
+        labels = self.labels
+        return [(labels[label_ind], exit_time) for label_ind, exit_time in
+                zip(self.__label_inds[start:end].tolist(), self.__exit_times[start:end].tolist())]
+
+    def __len__(self) -> int:
+        self.__compact()
+        return len(self.__entity_inds)
+
+    def __contains__(self, entity_ind: int) -> bool:
+        self.__compact()
+        pos = np.searchsorted(self.__entity_inds, entity_ind)
+        return pos < len(self.__entity_inds) and self.__entity_inds[pos] == entity_ind
+
+    def __iter__(self) -> Iterator[int]:
+        self.__compact()
+        return iter(self.__entity_inds[self.__first_exit_order].tolist())
+
+    def __getitem__(self, entity_ind: int) -> List[Tuple[str, float]]:
+        if entity_ind not in self:
+            raise KeyError(entity_ind)
+        return self.__trace(int(np.searchsorted(self.__entity_inds, entity_ind)))
+
+    def items(self) -> Iterator[Tuple[int, List[Tuple[str, float]]]]:
+        """
+        Iterate over (entity index, trace) pairs
+        """
+
+        self.__compact()
+        entity_inds = self.__entity_inds.tolist()
+        for pos in self.__first_exit_order.tolist():
+            yield entity_inds[pos], self.__trace(pos)
+
+
 @dataclass
 class Assignment:
     assign_type: AssignType
@@ -58,47 +193,176 @@ class Assignment:
     assign_value_handler: Optional[Callable[[dict, dict], any]]
 
 
-@dataclass
+@dataclass(slots=True)
 class Entity:
     entity_type: str
     arrival_time: float
-    entity_ind: int = field(default_factory=count().__next__)
+    entity_ind: int
     serial: UUID = field(default_factory=uuid4)
     attr: dict = field(default_factory=dict)
 
+    def iter_members(self) -> Tuple[Entity, ...]:
+        """
+        Return the entities an event on this entity applies to
+        """
 
-@dataclass
+        return (self,)
+
+
+@dataclass(slots=True)
 class BatchEntity(Entity):
     is_permanent: bool = True
-    batched_entities: List[Entity] = field(default_factory=list)
+    batched_entities: Tuple[Entity, ...] = ()
+
+    def iter_members(self) -> Tuple[Entity, ...]:
+        """
+        Return the entities an event on this entity applies to: the batch entity followed by its batched entities
+        """
 
+        return (self, *self.batched_entities)
 
-@dataclass
+
+@dataclass(slots=True, eq=False)
 class Event:
     event_time: float
     event_name: str
-    event_message: str
+    event_message: Union[str, Tuple[str, tuple]]
     event_handler: Callable[[Event, dict], List[Event]]
     event_entity: Entity
-    attr: dict = field(default_factory=dict)
+    delay_time: float = 0.
+    wait_time: float = 0.
+    batch_entities: Optional[List[Tuple[Entity, float]]] = None
 
     def __str__(self):
-        return f'{self.event_name} Event: {self.event_message}\nTime: {self.event_time}'
-
-
-@dataclass
+        # event messages may be deferred as (template, args) pairs so they are only formatted when printed
+        event_message = self.event_message
+        if isinstance(event_message, tuple):
+            template, args = event_message
+            event_message = template % args
+        return f'{self.event_name} Event: {event_message}\nTime: {self.event_time}'
+
+
+# consumed events kept for reuse by acquire_event, up to EVENT_POOL_SIZE events
+EVENT_POOL_SIZE = 1024
+_event_pool: List[Event] = []
+
+
+def acquire_event(event_time: float, event_name: str, event_message: Union[str, Tuple[str, tuple]],
+                  event_handler: Callable[[Event, dict], List[Event]], event_entity: Entity,
+                  delay_time: float = 0., wait_time: float = 0.,
+                  batch_entities: Optional[List[Tuple[Entity, float]]] = None) -> Event:
+    """
+    Return event with given values, reinitializing a pooled event if one is available
+
+    :param event_time: system time of event
+    :param event_name: event name
+    :param event_message: event message, or (template, args) pair formatted when printed
+    :param event_handler: event handler of module that processes event
+    :param event_entity: entity the event applies to
+    :param delay_time: delay time of entity, for events scheduled by Delay Modules
+    :param wait_time: time entity waited in a resource queue, for Seize events scheduled on resource release
+    :param batch_entities: (entity, queue entry time) pairs batched, for events scheduled by Batch Modules
+    """
+
+    if _event_pool:
+        event = _event_pool.pop()
+        event.event_time = event_time
+        event.event_name = event_name
+        event.event_message = event_message
+        event.event_handler = event_handler
+        event.event_entity = event_entity
+        event.delay_time = delay_time
+        event.wait_time = wait_time
+        event.batch_entities = batch_entities
+        return event
+    return Event(event_time, event_name, event_message, event_handler, event_entity, delay_time, wait_time, batch_entities)
+
+
+def release_event(event: Event):
+    """
+    Return processed event to the event pool; the event must not be referenced afterwards
+
+    :param event: processed event
+    """
+
+    if len(_event_pool) < EVENT_POOL_SIZE:
+        _event_pool.append(event)
+
+
+@dataclass(slots=True)
 class Resource:
     name: str
     capacity: int
-    queue: List[Tuple[float, int, int, Entity, Callable]] = field(default_factory=list)
-    availability_log: List[Tuple[float, int]] = field(default_factory=list)
+    queue: Deque[Tuple[float, int, int]] = field(default_factory=deque)
+    # availability logging interval, set from Environment.log_interval at the start of each run
+    log_interval: int = field(default=1, init=False)
+    available: int = field(init=False)
+    _queue_payload: Dict[int, Tuple[Entity, Callable]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _queue_counter: Iterator[int] = field(default_factory=itertools.count, init=False, repr=False, compare=False)
+    _log_times: np.ndarray = field(init=False, repr=False, compare=False)
+    _log_avail: np.ndarray = field(init=False, repr=False, compare=False)
+    _log_n: int = field(init=False, repr=False, compare=False)
+    _change_count: int = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         self.available = self.capacity
+        self.reserve_log(64)
+
+    def reset(self):
+        """
+        Restore full availability and clear the queue and availability log
+        """
+
+        self.available = self.capacity
+        self.queue.clear()
+        self._queue_payload.clear()
+        self._queue_counter = itertools.count()
+        self.reserve_log(64)
+
+    @property
+    def availability_log(self) -> List[Tuple[float, int]]:
+        """
+        Logged (time, available) pairs
+        """
+
+        return list(zip(self._log_times[:self._log_n].tolist(), self._log_avail[:self._log_n].tolist()))
+
+    def reserve_log(self, n: int):
+        """
+        Preallocate availability log arrays with room for given number of entries, discarding any previous entries
+
+        :param n: expected number of availability log entries
+        """
+
+        self._log_times = np.empty(max(n, 1), dtype=np.float64)
+        self._log_avail = np.empty(max(n, 1), dtype=np.int32)
+        self._log_n = 0
+        self._change_count = 0
+
+    def __log_availability(self, log_time: float):
+        """
+        Write current availability to the next availability log slot, doubling the log arrays if the reserve is exhausted.
+        Only every log_interval-th change is recorded, and none when log_interval is -1.
+
+        :param log_time: system time of availability change
+        """
+
+        if self.log_interval != 1:
+            self._change_count += 1
+            if self.log_interval == -1 or self._change_count % self.log_interval != 0:
+                return
+        if self._log_n == len(self._log_times):
+            self._log_times = np.concatenate((self._log_times, np.empty_like(self._log_times)))
+            self._log_avail = np.concatenate((self._log_avail, np.empty_like(self._log_avail)))
+        self._log_times[self._log_n] = log_time
+        self._log_avail[self._log_n] = self.available
+        self._log_n += 1
 
     def queue_entity(self, entity: Entity, num_resources: int, queue_entry_time: float, event_handler: Callable):
         """
-        Queue entity for resource
+        Queue entity for resource; the queue holds (queue entry time, queue number, resources required) entries sorted
+        by queue entry time and keyed into the queue payload by queue number, so queued entities are served first-come
+        first-served
 
         :param entity: queued entity
         :param num_resources: number of resources required
@@ -106,7 +370,15 @@ class Resource:
         :param event_handler: event handler of module that queued entity for resource
         """
 
-        heapq.heappush(self.queue, (queue_entry_time, num_resources, entity.entity_ind, entity, event_handler))
+        queue_num = next(self._queue_counter)
+        entry = (queue_entry_time, queue_num, num_resources)
+        if self.queue and entry < self.queue[-1]:
+            # entities queued out of time order are inserted in place to keep the queue sorted
+            bisect.insort(self.queue, entry)
+        else:
+            # entities are queued at the current system time, so the queue is normally appended to in order
+            self.queue.append(entry)
+        self._queue_payload[queue_num] = (entity, event_handler)
 
     def seize(self, num_resources: int, seize_time: float):
         """
@@ -116,10 +388,11 @@ class Resource:
         :param seize_time: system time at seize event
         """
 
-        if self.available - num_resources < 0:
+        # the availability check is skipped under python -O; SeizeModule only seizes after checking availability
+        if __debug__ and self.available < num_resources:
             raise ValueError(f'Unable to seize {self.name} resources in excess of available. Seized: {num_resources}, Available: {self.available}.')
         self.available -= num_resources
-        self.availability_log.append((seize_time, self.available))
+        self.__log_availability(seize_time)
 
     def release(self, num_resources: int, release_time: float) -> Optional[Event]:
         """
@@ -129,39 +402,42 @@ class Resource:
         :param release_time: system time at release event
         """
 
-        # release given number of resources
-        if num_resources > self.capacity - self.available:
+        # release given number of resources; the capacity check is skipped under python -O
+        if __debug__ and num_resources > self.capacity - self.available:
             raise ValueError(f'Unable to release {self.name} resources in excess of capacity. Released: {num_resources}, Available: {self.available}, Capacity: {self.capacity}.')
         self.available += num_resources
-        self.availability_log.append((release_time, self.available))
-
-        # check if there are enough resources for next entity in queue, if so seize resources
-        if len(self.queue) != 0:
-            queue_entry_time, required_resources, _, next_entity, event_handler = self.queue[0]
-            if required_resources <= self.available:
-                self.seize(num_resources, release_time)
-                heapq.heappop(self.queue)
-                return Event(
-                    event_time=release_time,
-                    event_name='Seize',
-                    event_message=f'{next_entity.entity_type} {next_entity.entity_ind} entity seized {required_resources} {self.name} resources',
-                    event_handler=event_handler,
-                    event_entity=next_entity,
-                    attr={
-                        'wait_time': release_time - queue_entry_time
-                    }
-                )
+
+        # check if there are enough resources for next entity in queue, if so seize them at the same log entry
+        queue = self.queue
+        if queue and queue[0][2] <= self.available:
+            queue_entry_time, queue_num, required_resources = queue.popleft()
+            next_entity, event_handler = self._queue_payload.pop(queue_num)
+            self.available -= required_resources
+            self.__log_availability(release_time)
+            return acquire_event(
+                event_time=release_time,
+                event_name='Seize',
+                event_message=('%s %d entity seized %d %s resources', (next_entity.entity_type, next_entity.entity_ind, required_resources, self.name)),
+                event_handler=event_handler,
+                event_entity=next_entity,
+                wait_time=release_time - queue_entry_time
+            )
+
+        self.__log_availability(release_time)
         return None
 
     def calc_utilization(self, duration: float) -> float:
         """
-        Calculate resource utilization (integral of availability curve)
+        Calculate resource utilization (integral of availability curve). Sampled logs (log_interval > 1) give an
+        approximation, and utilization is undefined (NaN) when logging is disabled or the duration is zero.
 
         :param duration: simulation duration
         """
 
-        resource_utilization = 0
-        for (t1, a1), (t2, _) in zip(self.availability_log, self.availability_log[1:]):
-            resource_utilization += (t2 - t1) * (self.capacity - a1)
+        if self.log_interval == -1 or duration <= 0:
+            return float('nan')
+        log_times = self._log_times[:self._log_n]
+        log_in_use = self.capacity - self._log_avail[:max(self._log_n - 1, 0)]
+        resource_utilization = float(np.dot(np.diff(log_times), log_in_use))
         max_utilization = self.capacity * duration
         return resource_utilization / max_utilization
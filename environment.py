@@ -5,26 +5,36 @@ Environment containing all simulation modules and simulation-level variables
 """
 
 import pandas as pd
-import numpy as np
-import random
-import math
-import heapq
-from typing import List, Tuple, Callable, Dict
-from dataclasses import dataclass, field
-from enum import Enum
+import os
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Iterator, Type, Optional
+from dataclasses import dataclass, field, fields
 
 import generators
-from generators import *
-from modules import *
-from datatypes import *
+from modules import Module, ArrivalModule, refresh_debug
+from datatypes import Resource, EntityMetrics, EntityTrace, release_event
+from eventqueue import EventQueue, BucketQueue
 
 
 @dataclass
 class Environment:
     module_chains: List[ArrivalModule] = field(default_factory=list)
-    event_queue: List[Tuple[float, int, Event]] = field(default_factory=list)
+    # event queue of the current run, constructed from event_queue_type (and event_resolution) at the start of each run
+    event_queue: Optional[EventQueue] = field(default=None, init=False, repr=False)
+    event_queue_type: Type[EventQueue] = BucketQueue
+    event_resolution: Optional[float] = None
+    log_interval: int = 1
+    inline_zero_delay: bool = True
     variables: List[Tuple[str, any]] = field(default_factory=list)
     sys_var: dict = field(default_factory=dict)
+    _entity_counter: Iterator[int] = field(default_factory=itertools.count, init=False, repr=False)
+    _resources: List[Resource] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.log_interval != -1 and self.log_interval < 1:
+            raise ValueError(f'Invalid log_interval: {self.log_interval}. Expected -1 (no logging) or an interval of at least 1.')
 
     def __populate_event_queue_arrivals(self, end_time: float):
         """
@@ -33,55 +43,199 @@ class Environment:
         :param end_time: simulation end time
         """
 
+        arrival_events = []
         for arrival_mod in self.module_chains:
-            arrival_events = arrival_mod.generate_arrivals(end_time)
-            for event in arrival_events:
-                self.__add_event(event)
+            arrival_events.extend(arrival_mod.generate_arrivals(end_time, self._entity_counter))
+
+        if issubclass(self.event_queue_type, BucketQueue):
+            # size buckets to hold roughly 8 arrivals each unless a resolution was given
+            resolution = self.event_resolution or max(8 * end_time / max(len(arrival_events), 1), 1e-9)
+            self.event_queue = self.event_queue_type(resolution=resolution)
+        else:
+            self.event_queue = self.event_queue_type()
+        self.event_queue.extend(arrival_events)
 
-    def __add_event(self, event: Event):
+    def __collect_modules(self) -> List[Module]:
+        """
+        Walk module chains and collect every distinct module reachable from them
         """
-        Add event to event queue (min heap based on event time)
 
-        :param event: event to add to queue
+        modules = []
+        visited = set()
+        unvisited = list(self.module_chains)
+        while unvisited:
+            mod = unvisited.pop()
+            if id(mod) in visited:
+                continue
+            visited.add(id(mod))
+            modules.append(mod)
+            for f in fields(mod):
+                val = getattr(mod, f.name)
+                if isinstance(val, Module):
+                    unvisited.append(val)
+        return modules
+
+    def __collect_resources(self, modules: List[Module]) -> List[Resource]:
         """
+        Collect the distinct resources referenced by given modules
 
-        heapq.heappush(self.event_queue, (event.event_time, event.event_entity.entity_ind, event))
+        :param modules: modules to search for resources
+        """
 
-    def add_variable(self, var: str, val: object):
-        self.variables.append((var, val))
+        resources = []
+        for mod in modules:
+            for f in fields(mod):
+                val = getattr(mod, f.name)
+                if isinstance(val, Resource) and all(val is not r for r in resources):
+                    resources.append(val)
+        return resources
 
-    def run_simulation(self, duration: float) -> Tuple[dict, pd.DataFrame]:
+    def reset(self):
         """
-        Run simulation from initial state for given duration and calculate metrics
-
-        :param duration: duration of simulation
+        Restore initial simulation state: system variables, entity counter, and module and resource state left over
+        from any previous run. Called at the start of each run, so an environment can be run repeatedly without
+        rebuilding its module chains.
         """
 
+        # entity indices are assigned densely from zero in each run
+        self._entity_counter = itertools.count()
         self.sys_var = {
             'entity': {
-                'metrics': {},
-                'trace': {}
+                # number of entity indices assigned so far in the run
+                'count': 0,
+                'metrics': None,
+                'trace': None
             },
             'variables': {
                 var: v
                 for var, v in self.variables
             },
-            'metrics': {}
+            'metrics': {
+                'Total Entity System Time': 0.
+            }
         }
+
+        # index modules into the entity trace labels
+        modules = self.__collect_modules()
+        for trace_ind, mod in enumerate(modules):
+            mod.reset()
+            mod.trace_ind = trace_ind
+        self.sys_var['entity']['trace'] = EntityTrace([f'Exit {mod.name}' for mod in modules])
+
+        self._resources = self.__collect_resources(modules)
+        for resource in self._resources:
+            resource.reset()
+            resource.log_interval = self.log_interval
+
+    def add_variable(self, var: str, val: object):
+        self.variables.append((var, val))
+
+    def run_simulation(self, duration: float, compute_dataframe: bool = True) -> Tuple[dict, Optional[pd.DataFrame]]:
+        """
+        Run simulation from initial state for given duration and calculate metrics
+
+        :param duration: duration of simulation
+        :param compute_dataframe: whether to build the entity metrics DataFrame (None is returned in its place if not)
+        """
+
+        refresh_debug()
+        self.reset()
         self.__populate_event_queue_arrivals(duration)
-        while len(self.event_queue) != 0 and self.event_queue[0][2].event_time <= duration:
-            # get next event and call handler function
-            curr_event_time, _, curr_event = heapq.heappop(self.event_queue)
-            new_events = curr_event.event_handler(curr_event, self.sys_var)
+        # entities created during the run take indices following those of the arrivals
+        self.sys_var['entity']['count'] = next(self._entity_counter)
+        self.sys_var['entity']['metrics'] = EntityMetrics(capacity=2 * len(self.event_queue))
+
+        # each arrival seizes and releases a resource about once
+        for resource in self._resources:
+            resource.reserve_log(2 * len(self.event_queue))
+
+        # bind loop invariants to locals to avoid attribute lookups per event
+        sys_var = self.sys_var
+        add_events = self.event_queue.add_events
+        inline_zero_delay = self.inline_zero_delay
+        for curr_event in self.event_queue.drain(duration):
+            # call handler function of next event
+            curr_time = curr_event.event_time
+            new_events = curr_event.event_handler(curr_event, sys_var)
+            release_event(curr_event)
+
+            if inline_zero_delay:
+                # handle events at the current time in order as they are generated rather than round-tripping them
+                # through the event queue, only queueing events scheduled later
+                later_events = []
+                i = 0
+                while i < len(new_events):
+                    event = new_events[i]
+                    i += 1
+                    if event.event_time <= curr_time:
+                        new_events.extend(event.event_handler(event, sys_var))
+                        release_event(event)
+                    else:
+                        later_events.append(event)
+                new_events = later_events
 
             # add new events to event queue
-            for event in new_events:
-                self.__add_event(event)
+            add_events(new_events)
 
-        # calculate metrics
-        sys_entity_metrics_df = pd.DataFrame.from_dict(self.sys_var['entity']['metrics'], orient='index')
-        sys_entity_metrics_df['Time in System'] = sys_entity_metrics_df['Disposed At'] - sys_entity_metrics_df['Created At']
-        self.sys_var['metrics']['Total Entity System Time'] = sum(sys_entity_metrics_df['Time in System'].dropna())
-        self.sys_var['metrics']['Average Entity System Time'] = self.sys_var['metrics']['Total Entity System Time'] / len(self.sys_var['entity']['metrics'].keys())
+        # calculate metrics (total entity system time is accumulated as entities are disposed)
+        self.sys_var['metrics']['Total Entity System Time'] = float(self.sys_var['metrics']['Total Entity System Time'])
+        # average is undefined (NaN) for a run without entities, e.g. a run of zero duration
+        n_entities = len(self.sys_var['entity']['metrics'])
+        self.sys_var['metrics']['Average Entity System Time'] = self.sys_var['metrics']['Total Entity System Time'] / n_entities if n_entities else float('nan')
+        if not compute_dataframe:
+            return self.sys_var, None
+
+        entity_inds, metrics_records = self.sys_var['entity']['metrics'].in_use()
+        sys_entity_metrics_df = pd.DataFrame(metrics_records, index=entity_inds)
+        sys_entity_metrics_df['Time in System'] = metrics_records['Disposed At'] - metrics_records['Created At']
 
         return self.sys_var, sys_entity_metrics_df
+
+    def run_replications(self, n: int, duration: float, seed: int = 0, max_workers: Optional[int] = None) -> List[Tuple[dict, pd.DataFrame]]:
+        """
+        Run independent replications of the simulation in parallel worker processes. Replication i is seeded with
+        seed + i, so results are reproducible regardless of how replications are assigned to workers. Workers are
+        forked from the current process and inherit the environment, so this requires the 'fork' start method.
+        Replications are seeded through generators.seed, so module chains must draw from the shared random number
+        generator: each worker inherits a copy of any generator passed to a generator function as rng, and
+        replications would draw the same or worker-dependent streams from it.
+
+        :param n: number of replications
+        :param duration: duration of each replication
+        :param seed: seed of first replication
+        :param max_workers: maximum number of worker processes (defaults to CPU count)
+        """
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_replication_worker,
+            initargs=(self,)
+        ) as executor:
+            return list(executor.map(_run_replication, range(seed, seed + n), [duration] * n))
+
+
+_replication_env: Optional[Environment] = None
+
+
+def _init_replication_worker(env: Environment):
+    """
+    Store the environment inherited by a replication worker process
+
+    :param env: environment to replicate
+    """
+
+    global _replication_env
+    _replication_env = env
+
+
+def _run_replication(seed: int, duration: float) -> Tuple[dict, pd.DataFrame]:
+    """
+    Run a single seeded replication in a worker process
+
+    :param seed: random seed for replication
+    :param duration: duration of simulation
+    """
+
+    generators.seed(seed)
+    return _replication_env.run_simulation(duration)
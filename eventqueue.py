@@ -0,0 +1,428 @@
+"""
+eventqueue.py
+
+Event queue implementations used by the simulation scheduler
+"""
+
+import heapq
+import bisect
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple, Optional, Generator
+
+from datatypes import Event
+
+
+@dataclass
+class EventQueue(ABC):
+    """
+    Priority queue of events ordered by event time, then insertion order. Queue entries are (event time, sequence
+    number) keys into the `events` side dict of queued events, so ties never fall back to comparing Event objects.
+    Events are removed from the side dict when popped, so it holds only the queued events.
+    """
+
+    events: Dict[int, Event] = field(default_factory=dict)
+    size: int = 0
+    next_seq: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _store_event(self, event: Event) -> Tuple[float, int]:
+        """
+        Store event in the side dict and return its queue entry
+
+        :param event: event to store
+        """
+
+        seq = self.next_seq
+        self.next_seq = seq + 1
+        self.events[seq] = event
+        self.size += 1
+        return event.event_time, seq
+
+    def _take_event(self, seq: int) -> Event:
+        """
+        Remove event from the side dict and return it
+
+        :param seq: sequence number of event
+        """
+
+        self.size -= 1
+        return self.events.pop(seq)
+
+    @abstractmethod
+    def add_event(self, event: Event):
+        """
+        Add event to the queue
+
+        :param event: event to add to queue
+        """
+        ...
+
+    def extend(self, events: List[Event]):
+        """
+        Bulk add events to the queue
+
+        :param events: events to add to queue
+        """
+
+        for event in events:
+            self.add_event(event)
+
+    def add_events(self, events: List[Event]):
+        """
+        Add a batch of events, bulk extending the queue when the batch is large relative to the queue size and adding
+        events one at a time otherwise
+
+        :param events: events to add to queue
+        """
+
+        if len(events) * 4 > self.size:
+            self.extend(events)
+        else:
+            for event in events:
+                self.add_event(event)
+
+    @abstractmethod
+    def peek_min(self) -> Event:
+        """
+        Return the earliest event without removing it from the queue
+        """
+        ...
+
+    @abstractmethod
+    def pop_min(self) -> Event:
+        """
+        Remove and return the earliest event in the queue
+        """
+        ...
+
+    def drain(self, end_time: float) -> Generator[Event, None, None]:
+        """
+        Pop events in time order through end time; events added while draining are scheduled as they arrive
+
+        :param end_time: latest event time to pop
+        """
+
+        while self.size and self.peek_min().event_time <= end_time:
+            yield self.pop_min()
+
+
+@dataclass
+class HeapQueue(EventQueue):
+    """
+    Binary heap priority queue
+    """
+
+    heap: List[Tuple[float, int]] = field(default_factory=list)
+
+    def add_event(self, event: Event):
+        heapq.heappush(self.heap, self._store_event(event))
+
+    def extend(self, events: List[Event]):
+        self.heap.extend(self._store_event(event) for event in events)
+        heapq.heapify(self.heap)
+
+    def peek_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('peek from empty HeapQueue')
+        return self.events[self.heap[0][1]]
+
+    def pop_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('pop from empty HeapQueue')
+        _, seq = heapq.heappop(self.heap)
+        return self._take_event(seq)
+
+
+@dataclass
+class SortedListQueue(EventQueue):
+    """
+    Sorted list priority queue; entries are kept negated in descending order so the earliest event pops from the end
+    of the list
+    """
+
+    entries: List[Tuple[float, int]] = field(default_factory=list)
+
+    def add_event(self, event: Event):
+        event_time, seq = self._store_event(event)
+        bisect.insort(self.entries, (-event_time, -seq))
+
+    def extend(self, events: List[Event]):
+        for event in events:
+            event_time, seq = self._store_event(event)
+            self.entries.append((-event_time, -seq))
+        self.entries.sort()
+
+    def peek_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('peek from empty SortedListQueue')
+        return self.events[-self.entries[-1][1]]
+
+    def pop_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('pop from empty SortedListQueue')
+        _, neg_seq = self.entries.pop()
+        return self._take_event(-neg_seq)
+
+
+@dataclass
+class CalendarQueue(EventQueue):
+    """
+    Calendar queue (Brown, 1988); events are hashed by event time into a ring of n_buckets sorted buckets of the given
+    width, one "year" spanning n_buckets * width. The ring is resized to keep between 0.5 and 2 events per bucket,
+    with the bucket width re-estimated from the spacing of the earliest events.
+    """
+
+    n_buckets: int = 2
+    width: float = 1.
+    buckets: List[List[Tuple[float, int]]] = field(default_factory=list)
+    bucket_num: int = 0
+    last_time: float = 0.
+
+    def __post_init__(self):
+        self.inv_width = 1 / self.width
+        self.buckets = [[] for _ in range(self.n_buckets)]
+
+    def __rebuild(self, n_buckets: int):
+        """
+        Redistribute all queued entries over given number of buckets, re-estimating the bucket width
+
+        :param n_buckets: new number of buckets
+        """
+
+        entries = sorted(entry for bucket in self.buckets for entry in bucket)
+
+        # width is three times the average separation of the earliest events
+        sample = [event_time for event_time, _ in entries[:25]]
+        separation = (sample[-1] - sample[0]) / (len(sample) - 1) if len(sample) > 1 else 0.
+        if separation > 0:
+            self.width = 3 * separation
+            self.inv_width = 1 / self.width
+
+        self.n_buckets = n_buckets
+        self.buckets = [[] for _ in range(n_buckets)]
+        for entry in entries:
+            self.buckets[int(entry[0] * self.inv_width) % n_buckets].append(entry)
+        self.bucket_num = int(self.last_time * self.inv_width)
+
+    def add_event(self, event: Event):
+        entry = self._store_event(event)
+        bisect.insort(self.buckets[int(entry[0] * self.inv_width) % self.n_buckets], entry)
+        if self.size > 2 * self.n_buckets:
+            self.__rebuild(2 * self.n_buckets)
+
+    def extend(self, events: List[Event]):
+        n_buckets = self.n_buckets
+        for event in events:
+            entry = self._store_event(event)
+            self.buckets[int(entry[0] * self.inv_width) % n_buckets].append(entry)
+        self.__rebuild(max(self.n_buckets, self.size))
+
+    def __locate(self) -> int:
+        """
+        Return the absolute bucket number (event time // width) of the earliest event
+        """
+
+        buckets = self.buckets
+        n_buckets = self.n_buckets
+        inv_width = self.inv_width
+        num = self.bucket_num
+        for _ in range(n_buckets):
+            bucket = buckets[num % n_buckets]
+            if bucket and int(bucket[0][0] * inv_width) <= num:
+                return num
+            num += 1
+
+        # no event within a year of the last event, fall back to a direct search
+        event_time, _ = min(bucket[0] for bucket in buckets if bucket)
+        return int(event_time * inv_width)
+
+    def peek_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('peek from empty CalendarQueue')
+        return self.events[self.buckets[self.__locate() % self.n_buckets][0][1]]
+
+    def pop_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('pop from empty CalendarQueue')
+        self.bucket_num = self.__locate()
+        self.last_time, seq = self.buckets[self.bucket_num % self.n_buckets].pop(0)
+        event = self._take_event(seq)
+        if 2 < self.n_buckets and 2 * self.size < self.n_buckets:
+            self.__rebuild(self.n_buckets // 2)
+        return event
+
+
+@dataclass
+class InboxQueue(EventQueue):
+    """
+    Partitioned priority queue; events are kept in an inbox heap per event handler (one per module), and a head heap
+    orders the inboxes by their earliest entry. Head entries left behind by a new earlier event or a pop are skipped
+    lazily.
+    """
+
+    inboxes: List[List[Tuple[float, int]]] = field(default_factory=list)
+    inbox_inds: Dict[Callable, int] = field(default_factory=dict)
+    heads: List[Tuple[float, int, int]] = field(default_factory=list)
+
+    def add_event(self, event: Event):
+        inbox_ind = self.inbox_inds.get(event.event_handler)
+        if inbox_ind is None:
+            inbox_ind = self.inbox_inds[event.event_handler] = len(self.inboxes)
+            self.inboxes.append([])
+        inbox = self.inboxes[inbox_ind]
+
+        entry = self._store_event(event)
+        if not inbox or entry < inbox[0]:
+            heapq.heappush(self.heads, (*entry, inbox_ind))
+        heapq.heappush(inbox, entry)
+
+    def __head(self) -> Tuple[float, int, int]:
+        """
+        Discard stale head entries and return the head entry of the inbox holding the earliest event
+        """
+
+        heads = self.heads
+        while True:
+            head = heads[0]
+            inbox = self.inboxes[head[2]]
+            if inbox and inbox[0][1] == head[1]:
+                return head
+            heapq.heappop(heads)
+
+    def peek_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('peek from empty InboxQueue')
+        return self.events[self.__head()[1]]
+
+    def pop_min(self) -> Event:
+        if self.size == 0:
+            raise IndexError('pop from empty InboxQueue')
+        _, seq, inbox_ind = self.__head()
+        inbox = self.inboxes[inbox_ind]
+        heapq.heappop(inbox)
+        if inbox:
+            heapq.heapreplace(self.heads, (*inbox[0], inbox_ind))
+        else:
+            heapq.heappop(self.heads)
+        return self._take_event(seq)
+
+
+@dataclass
+class BucketQueue(EventQueue):
+    """
+    Multiresolution priority queue; events are binned into coarse buckets of width `resolution` by event time and
+    ordered by a small heap within the active bucket
+    """
+
+    resolution: float = 1.
+    buckets: Dict[int, List[Tuple[float, int]]] = field(default_factory=dict)
+    bucket_inds: List[int] = field(default_factory=list)
+    current_bucket: Optional[int] = None
+
+    def __post_init__(self):
+        self.inv_resolution = 1 / self.resolution
+
+    def add_event(self, event: Event):
+        """
+        Add event to the bucket containing its event time
+
+        :param event: event to add to queue
+        """
+
+        bucket_ind = int(event.event_time * self.inv_resolution)
+        seq = self.next_seq
+        self.next_seq = seq + 1
+        entry = (event.event_time, seq)
+        self.events[seq] = event
+        bucket = self.buckets.get(bucket_ind)
+        if bucket is None:
+            self.buckets[bucket_ind] = [entry]
+            heapq.heappush(self.bucket_inds, bucket_ind)
+        elif bucket_ind == self.current_bucket:
+            # active bucket is already heapified
+            heapq.heappush(bucket, entry)
+        else:
+            bucket.append(entry)
+        self.size += 1
+
+    def extend(self, events: List[Event]):
+        """
+        Bulk add events to the queue, heapifying the bucket index once rather than pushing per event
+
+        :param events: events to add to queue
+        """
+
+        buckets = self.buckets
+        queued = self.events
+        seq = self.next_seq
+        for event in events:
+            bucket_ind = int(event.event_time * self.inv_resolution)
+            entry = (event.event_time, seq)
+            queued[seq] = event
+            seq += 1
+            bucket = buckets.get(bucket_ind)
+            if bucket is None:
+                buckets[bucket_ind] = [entry]
+                self.bucket_inds.append(bucket_ind)
+            else:
+                bucket.append(entry)
+        self.next_seq = seq
+        self.size += len(events)
+
+        heapq.heapify(self.bucket_inds)
+        if self.current_bucket in buckets:
+            heapq.heapify(buckets[self.current_bucket])
+
+    def __advance(self) -> List[Tuple[float, int]]:
+        """
+        Advance the bucket cursor until the active bucket is non-empty and return it
+        """
+
+        bucket = self.buckets.get(self.current_bucket)
+        while not bucket:
+            self.buckets.pop(self.current_bucket, None)
+            self.current_bucket = heapq.heappop(self.bucket_inds)
+            bucket = self.buckets[self.current_bucket]
+            heapq.heapify(bucket)
+        return bucket
+
+    def peek_min(self) -> Event:
+        """
+        Return the earliest event without removing it from the queue
+        """
+
+        if self.size == 0:
+            raise IndexError('peek from empty BucketQueue')
+        return self.events[self.__advance()[0][1]]
+
+    def pop_min(self) -> Event:
+        """
+        Remove and return the earliest event in the queue
+        """
+
+        if self.size == 0:
+            raise IndexError('pop from empty BucketQueue')
+        _, seq = heapq.heappop(self.__advance())
+        self.size -= 1
+        return self.events.pop(seq)
+
+    def drain(self, end_time: float) -> Generator[Event, None, None]:
+        """
+        Pop events in time order through end time; events added while draining are scheduled as they arrive
+
+        :param end_time: latest event time to pop
+        """
+
+        heappop = heapq.heappop
+        buckets = self.buckets
+        pop_event = self.events.pop
+        while self.size:
+            bucket = buckets.get(self.current_bucket) or self.__advance()
+            if bucket[0][0] > end_time:
+                return
+            _, seq = heappop(bucket)
+            self.size -= 1
+            yield pop_event(seq)
@@ -4,124 +4,239 @@ generators.py
 Generator functions for common arrival distributions
 """
 
-import math
 import random
-from typing import Generator, Callable
+import itertools
+import weakref
+import numpy as np
+from typing import Iterator, Callable, Optional
 
+# number of variates drawn per call to the NumPy random generator
+BATCH_SIZE = 4096
 
-def exp_agg_generator(lambd: float) -> Callable[[float, float], Generator[float, None, None]]:
+_rng = np.random.default_rng()
+
+
+class _Batch(list):
+    """
+    Batch of buffered realizations drawn from the shared random number generator; hashed by identity so live batches
+    can be tracked weakly and emptied in place by seed()
+    """
+
+    __slots__ = ('__weakref__',)
+    __hash__ = object.__hash__
+    __eq__ = object.__eq__
+
+
+_live_batches: weakref.WeakSet = weakref.WeakSet()
+
+
+def seed(s: int):
+    """
+    Seed the random number generators used by all generator functions; samples buffered before seeding are discarded
+
+    :param s: seed
     """
-    Returns a function that produces from [start_time, end_time] an inter-arrival generator according to an exponential distribution
+
+    global _rng
+    random.seed(s)
+    _rng = np.random.default_rng(s)
+
+    # emptying a batch ends iteration over it, so its generator draws its next batch from the reseeded generator
+    for batch in list(_live_batches):
+        batch.clear()
+
+
+def _buffered_generator(draw: Callable[[np.random.Generator, int], np.ndarray],
+                        rng: Optional[np.random.Generator] = None) -> Iterator[float]:
+    """
+    Iterator yielding realizations drawn in batches of BATCH_SIZE. Batches are chained by itertools.chain, so
+    advancing the iterator only runs Python code once per batch.
+
+    :param draw: function returning an array of given number of realizations drawn from given random number generator
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
+    """
+
+    if rng is not None:
+        # a caller-supplied generator is unaffected by seed(), so its batches are never discarded
+        return itertools.chain.from_iterable(iter(lambda: draw(rng, BATCH_SIZE).tolist(), None))
+
+    def draw_batch() -> _Batch:
+        batch = _Batch(draw(_rng, BATCH_SIZE).tolist())
+        _live_batches.add(batch)
+        return batch
+
+    return itertools.chain.from_iterable(iter(draw_batch, None))
+
+
+def _cumulative_arrivals(draw: Callable[[np.random.Generator, int], np.ndarray], rng: Optional[np.random.Generator],
+                         mean_interval: float, start_time: float, end_time: float) -> np.ndarray:
+    """
+    Returns sorted array of arrival times in [start_time, end_time] from inter-arrival times drawn in a single batch,
+    sized at 1.2x the expected number of arrivals and topped up with further batches in the rare case that is not enough
+
+    :param draw: function returning an array of given number of inter-arrival times drawn from given random number generator
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
+    :param mean_interval: mean inter-arrival time
+    :param start_time: arrival start time
+    :param end_time: arrival end time
+    """
+
+    # a chain whose arrivals start after the run ends has no arrivals
+    if end_time <= start_time:
+        return np.empty(0, dtype=np.float64)
+
+    if rng is None:
+        rng = _rng
+    n = max(int(1.2 * (end_time - start_time) / mean_interval), 0) + 16
+    batches = []
+    time = start_time
+    while not batches or time < end_time:
+        # accumulate inter-arrival times into arrival times in place
+        arrivals = draw(rng, n)
+        np.cumsum(arrivals, out=arrivals)
+        arrivals += time
+        batches.append(arrivals)
+        time = arrivals[-1]
+    arrivals = batches[0] if len(batches) == 1 else np.concatenate(batches)
+    return arrivals[:np.searchsorted(arrivals, end_time, side='right')]
+
+
+def exp_agg_generator(lambd: float, rng: Optional[np.random.Generator] = None) -> Callable[[float, float], np.ndarray]:
+    """
+    Returns a function that produces from [start_time, end_time] a sorted array of arrival times according to an exponential distribution
 
     :param lambd: mean arrivals per time unit
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    def exp_agg_generator_bounded(start_time: float, end_time: float) -> Generator[float, None, None]:
-        time = start_time
-        while time < end_time:
-            u = random.uniform(0, 1)
-            time += (-1 / lambd) * math.log(u)
-            if time <= end_time:
-                yield time
+    scale = 1 / lambd
+
+    def exp_agg_generator_bounded(start_time: float, end_time: float) -> np.ndarray:
+        return _cumulative_arrivals(lambda g, n: g.exponential(scale, n), rng, scale, start_time, end_time)
 
     return exp_agg_generator_bounded
 
 
-def exp_generator(lambd: float) -> Generator[float, None, None]:
+def exp_generator(lambd: float, rng: Optional[np.random.Generator] = None) -> Iterator[float]:
     """
     Generator function for independent exponential realizations
 
     :param lambd: mean arrivals per time unit
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    while True:
-        u = random.uniform(0, 1)
-        yield (-1 / lambd) * math.log(u)
+    scale = 1 / lambd
+    return _buffered_generator(lambda g, n: g.exponential(scale, n), rng)
 
 
-def tria_agg_generator(low: float, high: float) -> Callable[[float, float], Generator[float, None, None]]:
+def _triangular_draw(low: float, high: float) -> Callable[[np.random.Generator, int], np.ndarray]:
     """
-    Returns a function that produces from [start_time, end_time] an inter-arrival generator according to a triangular distribution
+    Returns function drawing given number of triangular realizations with mode halfway between low and high; the
+    degenerate distribution (low == high), which NumPy rejects, yields low
+
+    :param low: lowest possible distribution value
+    :param high: highest possible distribution value
+    """
+
+    if low == high:
+        return lambda g, n: np.full(n, low, dtype=np.float64)
+    mode = (low + high) / 2
+    return lambda g, n: g.triangular(low, mode, high, n)
+
+
+def tria_agg_generator(low: float, high: float, rng: Optional[np.random.Generator] = None) -> Callable[[float, float], np.ndarray]:
+    """
+    Returns a function that produces from [start_time, end_time] a sorted array of arrival times according to a triangular distribution
 
     :param low: lowest possible inter-arrival time
     :param high: highest possible inter-arrival time
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    def tria_agg_generator_bounded(start_time: float, end_time: float) -> Generator[float, None, None]:
-        time = start_time
-        while time < end_time:
-            time += random.triangular(low, high)
-            if time <= end_time:
-                yield time
+    mode = (low + high) / 2
+    if mode <= 0:
+        raise ValueError(f'Mean inter-arrival time must be positive. Received: low={low}, high={high}.')
+
+    def tria_agg_generator_bounded(start_time: float, end_time: float) -> np.ndarray:
+        return _cumulative_arrivals(_triangular_draw(low, high), rng, mode, start_time, end_time)
 
     return tria_agg_generator_bounded
 
 
-def tria_generator(low: float, high: float) -> Generator[float, None, None]:
+def tria_generator(low: float, high: float, rng: Optional[np.random.Generator] = None) -> Iterator[float]:
     """
     Generator function for independent triangular realizations
 
     :param low: lowest possible distribution value
     :param high: highest possible distribution value
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    while True:
-        yield random.triangular(low, high)
+    return _buffered_generator(_triangular_draw(low, high), rng)
 
 
-def uniform_agg_generator(low: float, high: float) -> Callable[[float, float], Generator[float, None, None]]:
+def uniform_agg_generator(low: float, high: float, rng: Optional[np.random.Generator] = None) -> Callable[[float, float], np.ndarray]:
     """
-    Returns a function that produces from [start_time, end_time] an inter-arrival generator according to a uniform distribution
+    Returns a function that produces from [start_time, end_time] a sorted array of arrival times according to a uniform distribution
 
     :param low: lowest possible inter-arrival time
     :param high: highest possible inter-arrival time
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    def uniform_agg_generator_bounded(start_time: float, end_time: float) -> Generator[float, None, None]:
-        time = start_time
-        while time < end_time:
-            time += random.uniform(low, high)
-            if time <= end_time:
-                yield time
+    mean = (low + high) / 2
+    if mean <= 0:
+        raise ValueError(f'Mean inter-arrival time must be positive. Received: low={low}, high={high}.')
+
+    def uniform_agg_generator_bounded(start_time: float, end_time: float) -> np.ndarray:
+        return _cumulative_arrivals(lambda g, n: g.uniform(low, high, n), rng, mean, start_time, end_time)
 
     return uniform_agg_generator_bounded
 
 
-def uniform_generator(low: float, high: float) -> Generator[float, None, None]:
+def uniform_generator(low: float, high: float, rng: Optional[np.random.Generator] = None) -> Iterator[float]:
     """
     Generator function for independent uniform realizations
 
     :param low: lowest possible distribution value
     :param high: highest possible distribution value
+    :param rng: random number generator to draw from, defaults to the shared generator seeded by seed(); an explicit
+        generator is not reseeded by seed(), so it is not supported with Environment.run_replications
     """
 
-    while True:
-        yield random.uniform(low, high)
+    return _buffered_generator(lambda g, n: g.uniform(low, high, n), rng)
 
 
-def const_agg_generator(const: float) -> Callable[[float, float], Generator[float, None, None]]:
+def const_agg_generator(const: float) -> Callable[[float, float], np.ndarray]:
     """
-    Returns a function that produces from [start_time, end_time] an inter-arrival generator according to a constant interval
+    Returns a function that produces from [start_time, end_time] a sorted array of arrival times according to a constant interval
 
     :param const: constant time interval
     """
 
-    def const_agg_generator_bounded(start_time: float, end_time: float) -> Generator[float, None, None]:
-        time = start_time
-        while time < end_time:
-            time += const
-            if time <= end_time:
-                yield time
+    if const <= 0:
+        raise ValueError(f'Constant inter-arrival time must be positive. Received: {const}.')
+
+    def const_agg_generator_bounded(start_time: float, end_time: float) -> np.ndarray:
+        # scale an integer range rather than stepping np.arange by a float, which can overshoot end_time
+        n = max(int((end_time - start_time) / const), 0)
+        return start_time + const * np.arange(1, n + 1, dtype=np.float64)
 
     return const_agg_generator_bounded
 
 
-def const_generator(const: float) -> Generator[float, None, None]:
+def const_generator(const: float) -> Iterator[float]:
     """
     Generator function for (trivial) constant realizations
 
     :param const: constant to be yielded
     """
 
-    while True:
-        yield const
+    return itertools.repeat(const)
@@ -6,20 +6,52 @@ Simulation module definitions
 
 import heapq
 import logging
-from abc import ABC, abstractmethod
+import operator
+import numpy as np
 from dataclasses import dataclass, field
-from typing import Callable, Generator, List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Optional
 from itertools import count
 from collections import deque
 
 from datatypes import *
 
+logger = logging.getLogger(__name__)
 
-@dataclass
-class Module(ABC):
+# whether module events are logged, read from the logger level once per run rather than once per event
+_LOG_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+
+def refresh_debug():
+    """
+    Re-read whether module events are logged from the module logger level; called by Environment at the start of
+    each run so logging configured after import takes effect
+    """
+
+    global _LOG_DEBUG
+    _LOG_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+
+def set_debug(enabled: bool):
+    """
+    Enable or disable debug logging of module events
+
+    :param enabled: whether to log module events
+    """
+
+    logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+    refresh_debug()
+
+
+@dataclass(slots=True)
+class Module:
     name: str
+    _bound_process: Callable[[Event, dict], List[Event]] = field(init=False, repr=False, compare=False)
+    trace_ind: int = field(default=-1, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # bind process event once so events reuse a single bound method as their handler
+        self._bound_process = self.process_event
 
-    @abstractmethod
     def process_event(self, event: Event, sys_var: dict) -> List[Event]:
         """
         Process module event and pass entity to next module in the chain
@@ -27,22 +59,43 @@ class Module(ABC):
         :param event: event to process
         :param sys_var: system global variables
         """
-        ...
+
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Clear any state held by the module from a previous simulation run
+        """
+
+        pass
 
 
 class ArrivalModule(Module):
-    @abstractmethod
-    def generate_arrivals(self, end_time: float) -> List[Event]:
+    __slots__ = ()
+
+    def generate_arrival_times_array(self, end_time: float) -> np.ndarray:
+        """
+        Generate sorted array of arrival times through simulation end time
+
+        :param end_time: simulation end time
+        """
+
+        raise NotImplementedError
+
+    def generate_arrivals(self, end_time: float, entity_counter: Iterator[int]) -> List[Event]:
         """
         Generate arrival events through simulation end time
 
         :param end_time: simulation end time
+        :param entity_counter: counter assigning entity indices for the simulation run
         """
-        ...
+
+        raise NotImplementedError
 
 
 class IngestModule(Module):
-    @abstractmethod
+    __slots__ = ()
+
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
         Generate events corresponding to entity arrival at a module to be added to the event queue
@@ -50,7 +103,46 @@ class IngestModule(Module):
         :param entity: ingested entity
         :param ingest_time: system time at ingest event
         """
-        ...
+
+        raise NotImplementedError
+
+
+class _PassThroughMixin:
+    """
+    Ingest module mixin whose process event records the entity (and any batched entities) exiting the module and
+    passes it unchanged to next_module
+    """
+
+    __slots__ = ()
+
+    def process_event(self, event: Event, sys_var: dict) -> List[Event]:
+        """
+        Process event at module, pass to next module
+
+        :param event: event to process
+        :param sys_var: system global variables
+        """
+
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
+
+        record_trace = sys_var['entity']['trace'].record
+        for entity in event.event_entity.iter_members():
+            record_trace((entity.entity_ind, self.trace_ind, event.event_time))
+
+        return self.next_module.ingest_entity(event.event_entity, event.event_time)
+
+
+def next_entity_ind(sys_var: dict) -> int:
+    """
+    Return the next unused entity index in system global variables dict, for entities created during a run
+
+    :param sys_var: system global variables
+    """
+
+    entity_ind = sys_var['entity']['count']
+    sys_var['entity']['count'] = entity_ind + 1
+    return entity_ind
 
 
 def init_sys_var_entity(sys_var: dict, entity_type: str, entity_ind: int):
@@ -62,49 +154,116 @@ def init_sys_var_entity(sys_var: dict, entity_type: str, entity_ind: int):
     :param entity_ind: entity index
     """
 
-    sys_var['entity']['metrics'][entity_ind] = {
-        'Entity Type': entity_type,
-        'Value-Added Time': 0.,
-        'Non-Value-Added Time': 0.,
-        'Wait Time': 0.,
-        'Transfer Time': 0.,
-        'Other Time': 0.
-    }
-    sys_var['entity']['trace'][entity_ind] = []
+    sys_var['entity']['metrics'].init_entity(entity_ind, entity_type)
+
+
+def dispose_sys_var_entity(sys_var: dict, entity_ind: int, dispose_time: float):
+    """
+    Record entity disposal in system global variables dict and accumulate its time in system
+
+    :param sys_var: system global variables
+    :param entity_ind: entity index
+    :param dispose_time: system time at dispose event
+    """
+
+    columns = sys_var['entity']['metrics'].columns
+    columns['Disposed At'][entity_ind] = dispose_time
+    sys_var['metrics']['Total Entity System Time'] += dispose_time - columns['Created At'][entity_ind]
+
+
+def _assign_variable(sys_var: dict, entity: Entity, assign_name: str, assign_value_handler: Callable[[dict, dict], any]):
+    """
+    Assign handler value to system variable
+
+    :param sys_var: system global variables
+    :param entity: entity being assigned
+    :param assign_name: name of variable to assign
+    :param assign_value_handler: function of (variables, entity attributes) returning value to assign
+    """
+
+    sys_var['variables'][assign_name] = assign_value_handler(sys_var['variables'], entity.attr)
 
 
-@dataclass
+def _assign_attribute(sys_var: dict, entity: Entity, assign_name: str, assign_value_handler: Callable[[dict, dict], any]):
+    """
+    Assign handler value to entity attribute
+
+    :param sys_var: system global variables
+    :param entity: entity being assigned
+    :param assign_name: name of attribute to assign
+    :param assign_value_handler: function of (variables, entity attributes) returning value to assign
+    """
+
+    entity.attr[assign_name] = assign_value_handler(sys_var['variables'], entity.attr)
+
+
+def _assign_entity_type(sys_var: dict, entity: Entity, assign_name: str, assign_value_handler: Callable[[dict, dict], any]):
+    """
+    Assign entity type
+
+    :param sys_var: system global variables
+    :param entity: entity being assigned
+    :param assign_name: entity type to assign
+    :param assign_value_handler: unused, as the entity type is given by assign_name
+    """
+
+    entity.entity_type = assign_name
+
+
+# assignment operations by assignment type, each called as op(sys_var, entity, assign_name, assign_value_handler)
+_ASSIGN_OPS = {
+    AssignType.VARIABLE: _assign_variable,
+    AssignType.ATTRIBUTE: _assign_attribute,
+    AssignType.ENTITY_TYPE: _assign_entity_type
+}
+
+
+@dataclass(slots=True)
 class CreateModule(ArrivalModule):
     next_module: IngestModule
     gen_entity_type: str
-    arrival_generator: Callable[[float, float], Generator[float, None, None]]
+    arrival_generator: Callable[[float, float], np.ndarray]
     module_ind: int = field(default_factory=count().__next__)
     entities_per_arrival: int = 1
     max_arrivals: int = -1
     first_arrival_time: float = 0.
 
-    def generate_arrivals(self, end_time: float):
+    def generate_arrival_times_array(self, end_time: float) -> np.ndarray:
+        """
+        Generate sorted array of arrival times through simulation end time according to provided generator function
+
+        :param end_time: simulation end time
+        """
+
+        arrival_times = self.arrival_generator(self.first_arrival_time, end_time)
+        if not isinstance(arrival_times, np.ndarray):
+            # user-supplied arrival generators may still yield arrival times one at a time
+            arrival_times = np.fromiter(arrival_times, dtype=np.float64)
+        return arrival_times
+
+    def generate_arrivals(self, end_time: float, entity_counter: Iterator[int]) -> List[Event]:
         """
         Generate arrival events through simulation end time according to provided generator function
 
         :param end_time: simulation end time
+        :param entity_counter: counter assigning entity indices for the simulation run
         """
 
-        arrivals = self.arrival_generator(self.first_arrival_time, end_time)
-        arrival_events = []
-        for arrival_time in arrivals:
-            entity = Entity(
-                entity_type=self.gen_entity_type,
-                arrival_time=arrival_time
-            )
-            arrival_events.append(Event(
+        arrival_times = self.generate_arrival_times_array(end_time)
+        entity_type = self.gen_entity_type
+        event_handler = self._bound_process
+
+        # zip exhausts the arrival times before drawing an unused index from the entity counter
+        return [
+            acquire_event(
                 event_time=arrival_time,
                 event_name='Create',
-                event_message=f'{entity.entity_type} {entity.entity_ind} entity arrival',
-                event_handler=self.process_event,
-                event_entity=entity
-            ))
-        return arrival_events
+                event_message=('%s %d entity arrival', (entity_type, entity_ind)),
+                event_handler=event_handler,
+                event_entity=Entity(entity_type=entity_type, arrival_time=arrival_time, entity_ind=entity_ind)
+            )
+            for arrival_time, entity_ind in zip(arrival_times.tolist(), entity_counter)
+        ]
 
     def process_event(self, event: Event, sys_var: dict) -> List[Event]:
         """
@@ -114,22 +273,30 @@ class CreateModule(ArrivalModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
         event_entity_ind = event.event_entity.entity_ind
         init_sys_var_entity(sys_var, event.event_entity.entity_type, event_entity_ind)
-        sys_var['entity']['metrics'][event_entity_ind]['Created At'] = event.event_time
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
+        sys_var['entity']['metrics'].columns['Created At'][event_entity_ind] = event.event_time
+        sys_var['entity']['trace'].record((event_entity_ind, self.trace_ind, event.event_time))
 
         return self.next_module.ingest_entity(event.event_entity, event.event_time)
 
 
-@dataclass
-class SeizeModule(IngestModule):
+@dataclass(slots=True)
+class SeizeModule(_PassThroughMixin, IngestModule):
     next_module: IngestModule
     resource: Resource
     num_resources: int
     module_ind: int = field(default_factory=count().__next__)
+    _event_message: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        Module.__post_init__(self)
+
+        # static part of the event message is formatted once, leaving entity type and index to be filled in
+        self._event_message = '%s %d entity seized ' + f'{self.num_resources} {self.resource.name} resources'.replace('%', '%%')
 
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
@@ -139,18 +306,20 @@ class SeizeModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        if self.resource.available < self.num_resources:
-            self.resource.queue_entity(entity, self.num_resources, ingest_time, self.process_event)
+        resource = self.resource
+        if resource.available < self.num_resources:
+            resource.queue_entity(entity, self.num_resources, ingest_time, self._bound_process)
             return []
-        else:
-            self.resource.seize(self.num_resources, ingest_time)
-            return [Event(
-                event_time=ingest_time,
-                event_name='Seize',
-                event_message=f'{entity.entity_type} {entity.entity_ind} entity seized {self.num_resources} {self.resource.name} resources',
-                event_handler=self.process_event,
-                event_entity=entity
-            )]
+
+        # availability was just checked, so the seize cannot fail
+        resource.seize(self.num_resources, ingest_time)
+        return [acquire_event(
+            event_time=ingest_time,
+            event_name='Seize',
+            event_message=(self._event_message, (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
+            event_entity=entity
+        )]
 
     def process_event(self, event: Event, sys_var: dict) -> List[Event]:
         """
@@ -160,29 +329,32 @@ class SeizeModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        # entities seized on release of a resource waited in the resource queue
+        if event.wait_time:
+            wait_times = sys_var['entity']['metrics'].columns['Wait Time']
+            for entity in event.event_entity.iter_members():
+                wait_times[entity.entity_ind] += event.wait_time
 
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
-        if 'wait_time' in event.attr:
-            sys_var['entity']['metrics'][event_entity_ind]['Wait Time'] += event.attr['wait_time']
-
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
-                if 'wait_time' in event.attr:
-                    sys_var['entity']['metrics'][entity_ind]['Wait Time'] += event.attr['wait_time']
+        return _PassThroughMixin.process_event(self, event, sys_var)
 
-        return self.next_module.ingest_entity(event.event_entity, event.event_time)
 
-
-@dataclass
-class DelayModule(IngestModule):
+@dataclass(slots=True)
+class DelayModule(_PassThroughMixin, IngestModule):
     next_module: IngestModule
-    delay_generator: Generator[float, None, None]
+    delay_generator: Iterator[float]
     cost_allocation: CostType = CostType.VALUE_ADDED
     module_ind: int = field(default_factory=count().__next__)
+    _cost_field: str = field(init=False, repr=False, compare=False)
+    _next_delay: Callable[[], float] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        Module.__post_init__(self)
+
+        # pre-built delay generators iterate buffered NumPy batches in C, so drawing a delay is a single bound call
+        self._next_delay = iter(self.delay_generator).__next__
+
+        # entity metrics field the delay time is allocated to
+        self._cost_field = f'{self.cost_allocation.value} Time'
 
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
@@ -192,16 +364,14 @@ class DelayModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        delay_time = next(self.delay_generator)
-        return [Event(
+        delay_time = self._next_delay()
+        return [acquire_event(
             event_time=ingest_time + delay_time,
             event_name='Delay',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity completed delay',
-            event_handler=self.process_event,
+            event_message=('%s %d entity completed delay', (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity,
-            attr={
-                'delay_time': delay_time
-            }
+            delay_time=delay_time
         )]
 
     def process_event(self, event: Event, sys_var: dict) -> List[Event]:
@@ -212,27 +382,26 @@ class DelayModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        delay_time = event.delay_time
+        cost_times = sys_var['entity']['metrics'].columns[self._cost_field]
+        for entity in event.event_entity.iter_members():
+            cost_times[entity.entity_ind] += delay_time
 
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['metrics'][event_entity_ind][f'{self.cost_allocation.value} Time'] += event.attr['delay_time']
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
+        return _PassThroughMixin.process_event(self, event, sys_var)
 
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['metrics'][entity_ind][f'{self.cost_allocation.value} Time'] += event.attr['delay_time']
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
 
-        return self.next_module.ingest_entity(event.event_entity, event.event_time)
-
-
-@dataclass
-class ReleaseModule(IngestModule):
+@dataclass(slots=True)
+class ReleaseModule(_PassThroughMixin, IngestModule):
     next_module: IngestModule
     resource: Resource
     num_resources: int
     module_ind: int = field(default_factory=count().__next__)
+    _event_message: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        Module.__post_init__(self)
+
+        self._event_message = '%s %d entity released ' + f'{self.num_resources} {self.resource.name} resources'.replace('%', '%%')
 
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
@@ -242,48 +411,41 @@ class ReleaseModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        events = []
-
         # release resources, get next seize event if one occurs
         new_seize_event = self.resource.release(self.num_resources, ingest_time)
-        if new_seize_event:
-            events.append(new_seize_event)
 
-        events.append(Event(
+        event = acquire_event(
             event_time=ingest_time,
             event_name='Release',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity released {self.num_resources} {self.resource.name} resources',
-            event_handler=self.process_event,
+            event_message=(self._event_message, (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
-        ))
-        return events
-
-    def process_event(self, event: Event, sys_var: dict) -> List[Event]:
-        """
-        Process event at Release Module, pass to next module
-
-        :param event: event to process
-        :param sys_var: system global variables
-        """
-
-        logging.debug(event)
-
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
-
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
-
-        return self.next_module.ingest_entity(event.event_entity, event.event_time)
+        )
+        return [new_seize_event, event] if new_seize_event else [event]
 
 
-@dataclass
-class AssignModule(IngestModule):
+@dataclass(slots=True)
+class AssignModule(_PassThroughMixin, IngestModule):
     next_module: IngestModule
     assignments: List[Assignment]
     module_ind: int = field(default_factory=count().__next__)
+    _event_message: str = field(init=False, repr=False, compare=False)
+    _assign_ops: List[Tuple[Callable, str, Callable]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        Module.__post_init__(self)
+
+        assignment_names = ', '.join([assignment.assign_name for assignment in self.assignments])
+        self._event_message = '%s %d entity performed assignments: ' + assignment_names.replace('%', '%%')
+
+        # resolve each assignment to its operation once rather than dispatching on assignment type per entity
+        self._assign_ops = []
+        for assignment in self.assignments:
+            try:
+                assign_op = _ASSIGN_OPS[AssignType(assignment.assign_type)]
+            except ValueError:
+                raise ValueError(f'Invalid AssignType: {assignment.assign_type}') from None
+            self._assign_ops.append((assign_op, assignment.assign_name, assignment.assign_value_handler))
 
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
@@ -293,14 +455,11 @@ class AssignModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        assignment_names = ', '.join([assignment.assign_name for assignment in self.assignments])
-        assign_event_msg = f'{entity.entity_type} {entity.entity_ind} entity performed assignments: {assignment_names}'
-
-        return [Event(
+        return [acquire_event(
             event_time=ingest_time,
             event_name='Assign',
-            event_message=assign_event_msg,
-            event_handler=self.process_event,
+            event_message=(self._event_message, (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
         )]
 
@@ -312,30 +471,13 @@ class AssignModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        for assign_op, assign_name, assign_value_handler in self._assign_ops:
+            assign_op(sys_var, event.event_entity, assign_name, assign_value_handler)
 
-        for assignment in self.assignments:
-            if assignment.assign_type == AssignType.VARIABLE:
-                sys_var['variables'][assignment.assign_name] = assignment.assign_value_handler(sys_var['variables'], event.event_entity.attr)
-            elif assignment.assign_type == AssignType.ATTRIBUTE:
-                event.event_entity.attr[assignment.assign_name] = assignment.assign_value_handler(sys_var['variables'], event.event_entity.attr)
-            elif assignment.assign_type == AssignType.ENTITY_TYPE:
-                event.event_entity.entity_type = assignment.assign_name
-            else:
-                raise ValueError(f'Invalid AssignType: {assignment.assign_type}')
+        return _PassThroughMixin.process_event(self, event, sys_var)
 
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
 
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
-
-        return self.next_module.ingest_entity(event.event_entity, event.event_time)
-
-
-@dataclass
+@dataclass(slots=True)
 class DuplicateModule(IngestModule):
     next_module_orig: IngestModule
     next_module_dup: IngestModule
@@ -352,11 +494,11 @@ class DuplicateModule(IngestModule):
         if isinstance(entity, BatchEntity):
             raise TypeError(f'Invalid entity type provided to Duplicate Module. Expected: Entity. Received: BatchEntity.')
 
-        return [Event(
+        return [acquire_event(
             event_time=ingest_time,
             event_name='Duplicate',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity duplicated',
-            event_handler=self.process_event,
+            event_message=('%s %d entity duplicated', (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
         )]
 
@@ -368,25 +510,27 @@ class DuplicateModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
         # create duplicate entity with same serial and different entity_ind
         orig_entity = event.event_entity
         dup_entity = Entity(
             entity_type=orig_entity.entity_type,
             arrival_time=event.event_time,
+            entity_ind=next_entity_ind(sys_var),
             serial=orig_entity.serial,
             attr=orig_entity.attr
         )
 
         # entity trace and metrics updates
         event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
+        sys_var['entity']['trace'].record((event_entity_ind, self.trace_ind, event.event_time))
 
         dup_entity_ind = dup_entity.entity_ind
         init_sys_var_entity(sys_var, dup_entity.entity_type, dup_entity_ind)
-        sys_var['entity']['metrics'][dup_entity_ind]['Created At'] = event.event_time
-        sys_var['entity']['trace'][dup_entity_ind].append((f'Exit {self.name}', event.event_time))
+        sys_var['entity']['metrics'].columns['Created At'][dup_entity_ind] = event.event_time
+        sys_var['entity']['trace'].record((dup_entity_ind, self.trace_ind, event.event_time))
 
         # retrieve next events for orig and dup entities
         next_events = self.next_module_orig.ingest_entity(orig_entity, event.event_time)
@@ -395,8 +539,33 @@ class DuplicateModule(IngestModule):
         return next_events
 
 
-@dataclass
+# bucket key of entities missing the batch attribute of a Batch Module
+_NO_BATCH_ATTR = object()
+
+
+class _BatchedEntityList:
+    """
+    Batch event message argument listing the batched entities, joined only when the event is printed
+    """
+
+    __slots__ = ('batch_entities',)
+
+    def __init__(self, batch_entities: List[Tuple[Entity, float]]):
+        self.batch_entities = batch_entities
+
+    def __str__(self):
+        return ', '.join([f'{e.entity_type} {e.entity_ind}' for e, _ in self.batch_entities])
+
+
+@dataclass(slots=True)
 class BatchModule(IngestModule):
+    """
+    Combines batch_size entities into a batch entity, either any entities (BatchType.ANY) or entities with equal
+    values of attribute batch_attr (BatchType.ATTRIBUTE). Entities queued for BatchType.ANY are held in queue, while
+    entities queued for BatchType.ATTRIBUTE are held in buckets by attribute value; queue_length counts both.
+    Hashable attribute values are looked up by hash, unhashable values (e.g. lists) by an equality scan of their buckets.
+    """
+
     next_module: IngestModule
     batch_type: BatchType
     batch_size: int
@@ -404,6 +573,27 @@ class BatchModule(IngestModule):
     batch_entity_type: Optional[str] = None
     queue: deque[Tuple[Entity, float]] = field(default_factory=deque)
     module_ind: int = field(default_factory=count().__next__)
+    # queued entities by batch attribute value, for BatchType.ATTRIBUTE
+    _buckets: Dict[Any, deque[Tuple[Entity, float]]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # (attribute value, queued entities) pairs for unhashable batch attribute values, for BatchType.ATTRIBUTE
+    _unhashable_buckets: List[Tuple[Any, deque[Tuple[Entity, float]]]] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    def reset(self):
+        """
+        Clear entities left in the batch queue by a previous simulation run
+        """
+
+        self.queue.clear()
+        self._buckets.clear()
+        self._unhashable_buckets.clear()
+
+    @property
+    def queue_length(self) -> int:
+        """
+        Number of entities queued for batching
+        """
+
+        return len(self.queue) + sum(map(len, self._buckets.values())) + sum(len(b) for _, b in self._unhashable_buckets)
 
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
@@ -417,41 +607,44 @@ class BatchModule(IngestModule):
             raise TypeError(f'Invalid entity type provided to Batch Module. Expected: Entity. Received: BatchEntity.')
 
         if self.batch_type == BatchType.ATTRIBUTE:
-            needed_to_batch = self.batch_size - 1
-            match_indices = []
-
-            # search queue for matching entities to batch by attribute
-            for i, (q_entity, _) in enumerate(self.queue):
-                if self.batch_attr in q_entity.attr and self.batch_attr in entity.attr and \
-                        q_entity.attr[self.batch_attr] == entity.attr[self.batch_attr]:
-                    match_indices.append(i)
-                    needed_to_batch -= 1
-                    if needed_to_batch == 0:
-                        break
-
-            if needed_to_batch == 0:
-                # sufficient matches found in queue, remove matches from queue and return batch event
+            # entities without the batch attribute never match, they are kept in a bucket that is never batched
+            key = entity.attr.get(self.batch_attr, _NO_BATCH_ATTR)
+            try:
+                bucket = self._buckets.get(key)
+                hashable = True
+            except TypeError:
+                # unhashable attribute values are matched by equality, as hashing them is not possible
+                bucket = next((b for k, b in self._unhashable_buckets if k == key), None)
+                hashable = False
+            if bucket is None:
+                bucket = deque()
+                if hashable:
+                    self._buckets[key] = bucket
+                else:
+                    self._unhashable_buckets.append((key, bucket))
+
+            if key is not _NO_BATCH_ATTR and len(bucket) >= self.batch_size - 1:
+                # sufficient matches queued, remove earliest matches from bucket and return batch event
                 batch_entities: List[Tuple[Entity, float]] = [(entity, ingest_time)]
-                for i in match_indices:
-                    batch_entities.append(self.queue[i])
-                for i in match_indices:
-                    del self.queue[i]
-
-                event_msg = 'Batched entities: '
-                event_msg += ', '.join([f'{e.entity_type} {e.entity_ind}' for e, _ in batch_entities])
-                return [Event(
+                for _ in range(self.batch_size - 1):
+                    batch_entities.append(bucket.popleft())
+                if not bucket:
+                    if hashable:
+                        del self._buckets[key]
+                    else:
+                        self._unhashable_buckets = [(k, b) for k, b in self._unhashable_buckets if b is not bucket]
+
+                return [acquire_event(
                     event_time=ingest_time,
                     event_name='Batch',
-                    event_message=event_msg,
-                    event_handler=self.process_event,
+                    event_message=('Batched entities: %s', (_BatchedEntityList(batch_entities),)),
+                    event_handler=self._bound_process,
                     event_entity=entity,
-                    attr={
-                        'batch_entities': batch_entities
-                    }
+                    batch_entities=batch_entities
                 )]
             else:
-                # not enough matches found in queue, add ingested entity to queue
-                self.queue.append((entity, ingest_time))
+                # not enough matches queued, add ingested entity to its bucket
+                bucket.append((entity, ingest_time))
                 return []
 
         elif self.batch_type == BatchType.ANY:
@@ -461,17 +654,13 @@ class BatchModule(IngestModule):
                 for _ in range(self.batch_size - 1):
                     batch_entities.append(self.queue.popleft())
 
-                event_msg = 'Batched entities: '
-                event_msg += ', '.join([f'{e.entity_type} {e.entity_ind}' for e, _ in batch_entities])
-                return [Event(
+                return [acquire_event(
                     event_time=ingest_time,
                     event_name='Batch',
-                    event_message=event_msg,
-                    event_handler=self.process_event,
+                    event_message=('Batched entities: %s', (_BatchedEntityList(batch_entities),)),
+                    event_handler=self._bound_process,
                     event_entity=entity,
-                    attr={
-                        'batch_entities': batch_entities
-                    }
+                    batch_entities=batch_entities
                 )]
             else:
                 # not enough entities in queue, add ingested entity to queue
@@ -488,29 +677,35 @@ class BatchModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
         # combine entities into a single batch entity
         batch_entity = BatchEntity(
             entity_type=self.batch_entity_type or event.event_entity.entity_type,
             arrival_time=event.event_time,
-            batched_entities=[e for e, _ in event.attr['batch_entities']]
+            entity_ind=next_entity_ind(sys_var),
+            batched_entities=tuple([e for e, _ in event.batch_entities])
         )
 
         batch_entity_ind = batch_entity.entity_ind
         init_sys_var_entity(sys_var, batch_entity.entity_type, batch_entity_ind)
-        sys_var['entity']['metrics'][batch_entity_ind]['Created At'] = event.event_time
-        sys_var['entity']['trace'][batch_entity_ind].append((f'Exit {self.name}', event.event_time))
-
-        for entity, queue_entry_time in event.attr['batch_entities']:
+        sys_var['entity']['metrics'].columns['Created At'][batch_entity_ind] = event.event_time
+        record_trace = sys_var['entity']['trace'].record
+        record_trace((batch_entity_ind, self.trace_ind, event.event_time))
+
+        wait_times = sys_var['entity']['metrics'].columns['Wait Time']
+        event_time = event.event_time
+        trace_ind = self.trace_ind
+        for entity, queue_entry_time in event.batch_entities:
             entity_ind = entity.entity_ind
-            sys_var['entity']['metrics'][entity_ind]['Wait Time'] += (event.event_time - queue_entry_time)
-            sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
+            wait_times[entity_ind] += (event_time - queue_entry_time)
+            record_trace((entity_ind, trace_ind, event_time))
 
         return self.next_module.ingest_entity(batch_entity, event.event_time)
 
 
-@dataclass
+@dataclass(slots=True)
 class SeparateModule(IngestModule):
     next_module: IngestModule
     module_ind: int = field(default_factory=count().__next__)
@@ -526,11 +721,11 @@ class SeparateModule(IngestModule):
         if not isinstance(entity, BatchEntity):
             raise TypeError(f'Invalid entity type provided to Separate Module. Expected: BatchEntity. Received: {type(entity)}.')
 
-        return [Event(
+        return [acquire_event(
             event_time=ingest_time,
             event_name='Separate',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity separated',
-            event_handler=self.process_event,
+            event_message=('%s %d entity separated', (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
         )]
 
@@ -542,30 +737,44 @@ class SeparateModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
         assert isinstance(event.event_entity, BatchEntity)
 
         batch_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['metrics'][batch_entity_ind]['Disposed At'] = event.event_time
-        sys_var['entity']['trace'][batch_entity_ind].append((f'Exit {self.name}', event.event_time))
+        dispose_sys_var_entity(sys_var, batch_entity_ind, event.event_time)
+        record_trace = sys_var['entity']['trace'].record
+        record_trace((batch_entity_ind, self.trace_ind, event.event_time))
 
         next_events = []
+        event_time = event.event_time
+        trace_ind = self.trace_ind
+        ingest_entity = self.next_module.ingest_entity
         for entity in event.event_entity.batched_entities:
-            entity_ind = entity.entity_ind
-            sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
-            next_events.extend(self.next_module.ingest_entity(entity, event.event_time))
+            record_trace((entity.entity_ind, trace_ind, event_time))
+            next_events.extend(ingest_entity(entity, event_time))
 
         return next_events
 
 
-@dataclass
+@dataclass(slots=True)
 class DecideTwoWayByConditionModule(IngestModule):
     true_next_module: IngestModule
     false_next_module: IngestModule
-    condition_handler: Callable[[dict, dict], bool]
+    condition_handler: Optional[Callable[[dict, dict], bool]] = None
+    # condition as a comparison of an entity attribute to a value, checked without calling a condition handler
+    cmp_attr: Optional[str] = None
+    cmp_value: Any = None
+    cmp_op: Callable[[Any, Any], bool] = operator.eq
     module_ind: int = field(default_factory=count().__next__)
 
+    def __post_init__(self):
+        Module.__post_init__(self)
+
+        if (self.condition_handler is None) == (self.cmp_attr is None):
+            raise ValueError('Decide Module requires exactly one of condition_handler or cmp_attr.')
+
     def ingest_entity(self, entity: Entity, ingest_time: float) -> List[Event]:
         """
         Generate decide two-way by condition event
@@ -574,11 +783,11 @@ class DecideTwoWayByConditionModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        return [Event(
+        return [acquire_event(
             event_time=ingest_time,
             event_name='Decide Two-Way By Condition',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity decided two-way path by condition',
-            event_handler=self.process_event,
+            event_message=('%s %d entity decided two-way path by condition', (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
         )]
 
@@ -590,23 +799,25 @@ class DecideTwoWayByConditionModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
+        record_trace = sys_var['entity']['trace'].record
+        for entity in event.event_entity.iter_members():
+            record_trace((entity.entity_ind, self.trace_ind, event.event_time))
 
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
+        if self.cmp_attr is not None:
+            condition = self.cmp_op(event.event_entity.attr[self.cmp_attr], self.cmp_value)
+        else:
+            condition = self.condition_handler(sys_var['variables'], event.event_entity.attr)
 
-        if self.condition_handler(sys_var['variables'], event.event_entity.attr):
+        if condition:
             return self.true_next_module.ingest_entity(event.event_entity, event.event_time)
         else:
             return self.false_next_module.ingest_entity(event.event_entity, event.event_time)
 
 
-@dataclass
+@dataclass(slots=True)
 class DisposeModule(IngestModule):
     module_ind: int = field(default_factory=count().__next__)
 
@@ -618,11 +829,11 @@ class DisposeModule(IngestModule):
         :param ingest_time: system time at ingest event
         """
 
-        return [Event(
+        return [acquire_event(
             event_time=ingest_time,
             event_name='Dispose',
-            event_message=f'{entity.entity_type} {entity.entity_ind} entity disposed',
-            event_handler=self.process_event,
+            event_message=('%s %d entity disposed', (entity.entity_type, entity.entity_ind)),
+            event_handler=self._bound_process,
             event_entity=entity
         )]
 
@@ -634,16 +845,12 @@ class DisposeModule(IngestModule):
         :param sys_var: system global variables
         """
 
-        logging.debug(event)
+        if _LOG_DEBUG:
+            logger.debug('%s', event)
 
-        event_entity_ind = event.event_entity.entity_ind
-        sys_var['entity']['metrics'][event_entity_ind]['Disposed At'] = event.event_time
-        sys_var['entity']['trace'][event_entity_ind].append((f'Exit {self.name}', event.event_time))
-
-        if isinstance(event.event_entity, BatchEntity):
-            for entity in event.event_entity.batched_entities:
-                entity_ind = entity.entity_ind
-                sys_var['entity']['metrics'][entity_ind]['Disposed At'] = event.event_time
-                sys_var['entity']['trace'][entity_ind].append((f'Exit {self.name}', event.event_time))
+        record_trace = sys_var['entity']['trace'].record
+        for entity in event.event_entity.iter_members():
+            dispose_sys_var_entity(sys_var, entity.entity_ind, event.event_time)
+            record_trace((entity.entity_ind, self.trace_ind, event.event_time))
 
         return []
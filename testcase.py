@@ -4,11 +4,14 @@ testcase.py
 Full test case for a simple simulation environment
 """
 
+import random
 import logging
-import argparse
-from generators import exp_agg_generator, exp_generator, tria_generator, uniform_generator
+import pandas as pd
+import generators
+from generators import exp_agg_generator, exp_generator, tria_generator
 from modules import *
 from environment import Environment
+from builder import ChainBuilder
 
 
 def testcase_1() -> Tuple[Environment, List[Resource]]:
@@ -42,27 +45,14 @@ def testcase_2() -> Tuple[Environment, List[Resource]]:
         capacity=1
     )
 
-    mod_chain = CreateModule(
-        name='Test Create',
-        gen_entity_type='Test',
-        arrival_generator=exp_agg_generator(1),
-        next_module=SeizeModule(
-            name='Test Seize',
-            resource=server,
-            num_resources=1,
-            next_module=DelayModule(
-                name='Test Delay',
-                delay_generator=exp_generator(1),
-                next_module=ReleaseModule(
-                    name='Test Release',
-                    resource=server,
-                    num_resources=1,
-                    next_module=DisposeModule(
-                        name='Test Dispose'
-                    )
-                )
-            )
-        )
+    mod_chain = (
+        ChainBuilder()
+        .create('Test Create', gen_entity_type='Test', arrival_generator=exp_agg_generator(1))
+        .seize('Test Seize', resource=server, num_resources=1)
+        .delay('Test Delay', delay_generator=exp_generator(1))
+        .release('Test Release', resource=server, num_resources=1)
+        .dispose('Test Dispose')
+        .build()
     )
 
     env = Environment(
@@ -157,76 +147,36 @@ def testcase_4() -> Tuple[Environment, List[Resource]]:
         capacity=2
     )
 
-    batch_mod_chain = BatchModule(
-        name='Batch 1',
-        batch_type=BatchType.ATTRIBUTE,
-        batch_size=2,
-        batch_attr='entity_id',
-        batch_entity_type='Person Group',
-        next_module=SeizeModule(
-            name='Seize Server 1 Again',
-            resource=server1,
-            num_resources=1,
-            next_module=DelayModule(
-                name='Delay 3',
-                delay_generator=tria_generator(0, 3),
-                cost_allocation=CostType.NON_VALUE_ADDED,
-                next_module=ReleaseModule(
-                    name='Release Server 1 Again',
-                    resource=server1,
-                    num_resources=1,
-                    next_module=DisposeModule(
-                        name='Dispose 1'
-                    )
-                )
-            )
-        )
+    batch_mod_chain = (
+        ChainBuilder()
+        .batch('Batch 1', batch_type=BatchType.ATTRIBUTE, batch_size=2, batch_attr='entity_id', batch_entity_type='Person Group')
+        .seize('Seize Server 1 Again', resource=server1, num_resources=1)
+        .delay('Delay 3', delay_generator=tria_generator(0, 3), cost_allocation=CostType.NON_VALUE_ADDED)
+        .release('Release Server 1 Again', resource=server1, num_resources=1)
+        .dispose('Dispose 1')
     )
 
-    mod_chain = CreateModule(
-        name='Create Person',
-        gen_entity_type='Person',
-        arrival_generator=exp_agg_generator(1),
-        next_module=AssignModule(
-            name='Assign entity ID',
-            assignments=[
-                Assignment(assign_type=AssignType.VARIABLE, assign_name='last_entity', assign_value_handler=assign_last_entity_handler),
-                Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='entity_id', assign_value_handler=assign_entity_id_handler)
-            ],
-            next_module=DuplicateModule(
-                name='Duplicate 1',
-                next_module_orig=SeizeModule(
-                    name='Seize Server 1',
-                    resource=server1,
-                    num_resources=1,
-                    next_module=DelayModule(
-                        name='Delay 1',
-                        delay_generator=exp_generator(1),
-                        next_module=ReleaseModule(
-                            name='Release Server 1',
-                            resource=server1,
-                            num_resources=1,
-                            next_module=batch_mod_chain
-                        )
-                    )
-                ),
-                next_module_dup=SeizeModule(
-                    name='Seize Server 2',
-                    resource=server2,
-                    num_resources=1,
-                    next_module=DelayModule(
-                        name='Delay 1',
-                        delay_generator=tria_generator(0, 2),
-                        next_module=ReleaseModule(
-                            name='Release Server 2',
-                            resource=server2,
-                            num_resources=1,
-                            next_module=batch_mod_chain
-                        )
-                    )
-                )
-            )
+    mod_chain = (
+        ChainBuilder()
+        .create('Create Person', gen_entity_type='Person', arrival_generator=exp_agg_generator(1))
+        .assign('Assign entity ID', assignments=[
+            Assignment(assign_type=AssignType.VARIABLE, assign_name='last_entity', assign_value_handler=assign_last_entity_handler),
+            Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='entity_id', assign_value_handler=assign_entity_id_handler)
+        ])
+        .duplicate(
+            'Duplicate 1',
+            orig=ChainBuilder()
+            .seize('Seize Server 1', resource=server1, num_resources=1)
+            .delay('Delay 1', delay_generator=exp_generator(1))
+            .release('Release Server 1', resource=server1, num_resources=1)
+            .then(batch_mod_chain),
+            dup=ChainBuilder()
+            .seize('Seize Server 2', resource=server2, num_resources=1)
+            .delay('Delay 1', delay_generator=tria_generator(0, 2))
+            .release('Release Server 2', resource=server2, num_resources=1)
+            .then(batch_mod_chain)
         )
+        .build()
     )
 
     env = Environment(
@@ -257,8 +207,8 @@ def testcase_5() -> Tuple[Environment, List[Resource]]:
     def assign_going_to_store1_handler(variables: dict, entity_attr: dict) -> any:
         return variables['last_entity_ind'] % 2 == 0
 
-    def decide_store_handler(variables: dict, entity_attr: dict) -> bool:
-        return entity_attr['going_to_store1']
+    # both Store 1 checkouts draw from one exponential stream rather than each buffering its own
+    store1_checkout_time_generator = exp_generator(1)
 
     clerk_store1 = Resource(
         name='Clerk Store 1',
@@ -269,101 +219,47 @@ def testcase_5() -> Tuple[Environment, List[Resource]]:
         capacity=2
     )
 
-    batch_mod_chain = BatchModule(
-        name='Rejoin Couple',
-        batch_type=BatchType.ATTRIBUTE,
-        batch_size=2,
-        batch_attr='couple_ind',
-        batch_entity_type='Couple',
-        next_module=SeizeModule(
-            name='Seize Store 1 Clerk Again',
-            resource=clerk_store1,
-            num_resources=1,
-            next_module=DelayModule(
-                name='Delay Store 1 Checkout Again',
-                delay_generator=exp_generator(1),
-                cost_allocation=CostType.VALUE_ADDED,
-                next_module=ReleaseModule(
-                    name='Release Store 1 Clerk Again',
-                    resource=clerk_store1,
-                    num_resources=1,
-                    next_module=DisposeModule(
-                        name='Depart Shopping District'
-                    )
-                )
-            )
-        )
+    batch_mod_chain = (
+        ChainBuilder()
+        .batch('Rejoin Couple', batch_type=BatchType.ATTRIBUTE, batch_size=2, batch_attr='couple_ind', batch_entity_type='Couple')
+        .seize('Seize Store 1 Clerk Again', resource=clerk_store1, num_resources=1)
+        .delay('Delay Store 1 Checkout Again', delay_generator=store1_checkout_time_generator, cost_allocation=CostType.VALUE_ADDED)
+        .release('Release Store 1 Clerk Again', resource=clerk_store1, num_resources=1)
+        .dispose('Depart Shopping District')
     )
 
-    mean_drive_time_generator = uniform_generator(1, 3)
+    # mean drive time is drawn once per environment; random is seeded along with the generators by generators.seed
+    mean_drive_time = random.uniform(1, 3)
 
-    store1_mod_chain = SeizeModule(
-        name='Seize Store 1 Clerk',
-        resource=clerk_store1,
-        num_resources=1,
-        next_module=DelayModule(
-            name='Delay Store 1 Checkout',
-            delay_generator=exp_generator(1),
-            cost_allocation=CostType.NON_VALUE_ADDED,
-            next_module=ReleaseModule(
-                name='Release Store 1 Clerk',
-                resource=clerk_store1,
-                num_resources=1,
-                next_module=batch_mod_chain
-            )
-        )
+    store1_mod_chain = (
+        ChainBuilder()
+        .seize('Seize Store 1 Clerk', resource=clerk_store1, num_resources=1)
+        .delay('Delay Store 1 Checkout', delay_generator=store1_checkout_time_generator, cost_allocation=CostType.NON_VALUE_ADDED)
+        .release('Release Store 1 Clerk', resource=clerk_store1, num_resources=1)
+        .then(batch_mod_chain)
     )
 
-    store2_mod_chain = SeizeModule(
-        name='Seize Store 2 Clerk',
-        resource=clerk_store2,
-        num_resources=1,
-        next_module=DelayModule(
-            name='Delay Store 2 Checkout',
-            delay_generator=tria_generator(1, 3.5),
-            cost_allocation=CostType.VALUE_ADDED,
-            next_module=ReleaseModule(
-                name='Release Store 2 Clerk',
-                resource=clerk_store2,
-                num_resources=1,
-                next_module=batch_mod_chain
-            )
-        )
+    store2_mod_chain = (
+        ChainBuilder()
+        .seize('Seize Store 2 Clerk', resource=clerk_store2, num_resources=1)
+        .delay('Delay Store 2 Checkout', delay_generator=tria_generator(1, 3.5), cost_allocation=CostType.VALUE_ADDED)
+        .release('Release Store 2 Clerk', resource=clerk_store2, num_resources=1)
+        .then(batch_mod_chain)
     )
 
-    mod_chain = CreateModule(
-        name='Create Person',
-        gen_entity_type='Person',
-        arrival_generator=exp_agg_generator(3),
-        next_module=AssignModule(
-            name='Assign Errands',
-            assignments=[
-                Assignment(assign_type=AssignType.VARIABLE, assign_name='last_entity_ind', assign_value_handler=assign_last_entity_ind_handler),
-                Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='couple_ind', assign_value_handler=assign_couple_ind_handler),
-                Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='going_to_store1', assign_value_handler=assign_going_to_store1_handler)
-            ],
-            next_module=BatchModule(
-                name='Create Couple',
-                batch_type=BatchType.ATTRIBUTE,
-                batch_attr='couple_ind',
-                batch_size=2,
-                batch_entity_type='Couple',
-                next_module=DelayModule(
-                    name='Drive to Shopping District',
-                    delay_generator=exp_generator(next(mean_drive_time_generator)),
-                    cost_allocation=CostType.VALUE_ADDED,
-                    next_module=SeparateModule(
-                        name='Split up for errands',
-                        next_module=DecideTwoWayByConditionModule(
-                            name='Choose store to enter',
-                            condition_handler=decide_store_handler,
-                            true_next_module=store1_mod_chain,
-                            false_next_module=store2_mod_chain
-                        )
-                    )
-                )
-            )
-        )
+    mod_chain = (
+        ChainBuilder()
+        .create('Create Person', gen_entity_type='Person', arrival_generator=exp_agg_generator(3))
+        .assign('Assign Errands', assignments=[
+            Assignment(assign_type=AssignType.VARIABLE, assign_name='last_entity_ind', assign_value_handler=assign_last_entity_ind_handler),
+            Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='couple_ind', assign_value_handler=assign_couple_ind_handler),
+            Assignment(assign_type=AssignType.ATTRIBUTE, assign_name='going_to_store1', assign_value_handler=assign_going_to_store1_handler)
+        ])
+        .batch('Create Couple', batch_type=BatchType.ATTRIBUTE, batch_attr='couple_ind', batch_size=2, batch_entity_type='Couple')
+        .delay('Drive to Shopping District', delay_generator=exp_generator(mean_drive_time), cost_allocation=CostType.VALUE_ADDED)
+        .separate('Split up for errands')
+        .decide('Choose store to enter', true_next=store1_mod_chain, false_next=store2_mod_chain, cmp_attr='going_to_store1', cmp_value=True)
+        .build()
     )
 
     env = Environment(
@@ -375,49 +271,149 @@ def testcase_5() -> Tuple[Environment, List[Resource]]:
     return env, resources
 
 
+TESTCASES = {
+    1: testcase_1,
+    2: testcase_2,
+    3: testcase_3,
+    4: testcase_4,
+    5: testcase_5
+}
+
+
+def run_batch(env: Environment, resources: List[Resource], durations: List[float], repeat: int,
+              compute_dataframe: bool = True):
+    """
+    Run environment repeatedly in-process, reusing its module chains, and print per-run and pooled metrics
+
+    :param env: environment to run
+    :param resources: resources to report utilization of
+    :param durations: simulation durations to run
+    :param repeat: number of runs of each duration
+    :param compute_dataframe: whether to build entity metrics DataFrames and print pooled metrics by entity type
+    """
+
+    run_metrics = []
+    entity_metrics_dfs = []
+    for duration in durations:
+        for run in range(repeat):
+            sys_var, sys_entity_metrics_df = env.run_simulation(duration, compute_dataframe=compute_dataframe)
+            run_metrics.append({
+                'Duration': duration,
+                'Run': run,
+                'Entities': len(sys_var['entity']['metrics']),
+                'Average Entity System Time': sys_var['metrics']['Average Entity System Time'],
+                **{f'{r.name} Utilization': r.calc_utilization(duration) for r in resources}
+            })
+            entity_metrics_dfs.append(sys_entity_metrics_df)
+
+    print('Run metrics:')
+    print(pd.DataFrame(run_metrics).set_index(['Duration', 'Run']))
+    if not compute_dataframe:
+        return
+    print('-----------')
+
+    # entity metrics of all runs are concatenated once, keyed by duration and run
+    all_entity_metrics_df = pd.concat(
+        entity_metrics_dfs,
+        keys=[(m['Duration'], m['Run']) for m in run_metrics],
+        names=['Duration', 'Run', 'Entity']
+    )
+    print('Mean values by Duration and Entity type:')
+    print(all_entity_metrics_df.groupby(['Duration', 'Entity Type']).mean().drop(columns=['Created At', 'Disposed At']))
+
+
+def run_parallel_replications(env: Environment, duration: float, n: int, max_workers: Optional[int], seed: int = 0):
+    """
+    Run independent seeded replications of environment in worker processes and print per-replication and pooled
+    metrics
+
+    :param env: environment to replicate
+    :param duration: duration of each replication
+    :param n: number of replications
+    :param max_workers: maximum number of worker processes (defaults to CPU count)
+    :param seed: seed of first replication
+    """
+
+    results = env.run_replications(n, duration, seed=seed, max_workers=max_workers)
+
+    print('Replication metrics:')
+    print(pd.DataFrame(
+        [{
+            'Entities': len(sys_entity_metrics_df),
+            'Average Entity System Time': sys_var['metrics']['Average Entity System Time']
+        } for sys_var, sys_entity_metrics_df in results],
+        index=pd.Index(range(n), name='Replication')
+    ))
+    print('-----------')
+
+    # entity metrics of all replications are concatenated once, keyed by replication
+    all_entity_metrics_df = pd.concat([df for _, df in results], keys=range(n), names=['Replication', 'Entity'])
+    print('Mean values by Entity type over all replications:')
+    print(all_entity_metrics_df.groupby('Entity Type').mean().drop(columns=['Created At', 'Disposed At']))
+
+
 def main():
+    # only needed when run as a script, so not imported with the test cases
+    import argparse
+
     parser = argparse.ArgumentParser()
     parser.add_argument('-c', '--case', type=int, default=5, help='Test case number (1, 2, 3, 4, 5).')
     parser.add_argument('-d', '--debug', action='store_true', help='Flag for debugging outputs.')
     parser.add_argument('-D', '--duration', type=float, default=1000., help='Duration of simulation in default time units.')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='Number of runs of each duration.')
+    parser.add_argument('-s', '--sweep', type=float, nargs='+', help='Durations to run in turn, in place of --duration.')
+    parser.add_argument('-R', '--replications', type=int, default=1, help='Number of independent seeded replications run in parallel.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Number of worker processes for replications (defaults to CPU count).')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs (seed of the first replication with --replications).')
+    parser.add_argument('--no-report', action='store_true', help='Skip building and printing the entity metrics DataFrame.')
     args = parser.parse_args()
 
+    # replications run a single duration and pool the entity metrics DataFrames of all replications
+    if args.replications > 1:
+        if args.sweep or args.repeat > 1 or args.no_report:
+            parser.error('--sweep, --repeat and --no-report are not supported with --replications')
+    elif args.workers is not None:
+        parser.error('--workers requires --replications')
+
     if args.debug:
         logging.basicConfig(level=logging.DEBUG)
 
-    match args.case:
-        case 1:
-            env, resources = testcase_1()
-        case 2:
-            env, resources = testcase_2()
-        case 3:
-            env, resources = testcase_3()
-        case 4:
-            env, resources = testcase_4()
-        case 5:
-            env, resources = testcase_5()
-        case _:
-            raise ValueError('Invalid test case number provided:', args.case)
-
-    sys_var, sys_entity_metrics_df = env.run_simulation(args.duration)
-    entity_traces = sys_var['entity']['trace']
+    # seeded before the test case is built, as building test case 5 draws its mean drive time
+    if args.seed is not None:
+        generators.seed(args.seed)
 
-    # system metric outputs
-    print('Entity metrics:')
-    print(sys_entity_metrics_df)
-    print('-----------')
+    if args.case not in TESTCASES:
+        raise ValueError(f'Invalid test case number provided: {args.case}')
+    env, resources = TESTCASES[args.case]()
 
-    print('Mean values by Entity type:')
-    print(sys_entity_metrics_df.groupby('Entity Type').mean().drop(columns=['Created At', 'Disposed At']))
-    print('-----------')
+    if args.replications > 1:
+        run_parallel_replications(env, args.duration, args.replications, args.workers, args.seed or 0)
+        return
 
-    print('Median values by Entity type:')
-    print(sys_entity_metrics_df.groupby('Entity Type').median().drop(columns=['Created At', 'Disposed At']))
-    print('-----------')
+    if args.sweep or args.repeat > 1:
+        run_batch(env, resources, args.sweep or [args.duration], args.repeat, compute_dataframe=not args.no_report)
+        return
 
-    print('Aggregate values by Entity type:')
-    print(sys_entity_metrics_df.groupby('Entity Type').sum().drop(columns=['Created At', 'Disposed At']))
-    print('-----------')
+    sys_var, sys_entity_metrics_df = env.run_simulation(args.duration, compute_dataframe=not args.no_report)
+    entity_traces = sys_var['entity']['trace']
+
+    # system metric outputs
+    if not args.no_report:
+        print('Entity metrics:')
+        print(sys_entity_metrics_df)
+        print('-----------')
+
+        # all statistics by entity type are computed in a single groupby pass
+        entity_type_stats = (
+            sys_entity_metrics_df
+            .drop(columns=['Created At', 'Disposed At'])
+            .groupby('Entity Type')
+            .agg(['mean', 'median', 'sum'])
+        )
+        for title, stat in [('Mean', 'mean'), ('Median', 'median'), ('Aggregate', 'sum')]:
+            print(f'{title} values by Entity type:')
+            print(entity_type_stats.xs(stat, axis=1, level=1))
+            print('-----------')
 
     print('Total entity system time:', sys_var['metrics']['Total Entity System Time'])
     print('Average entity system time:', sys_var['metrics']['Average Entity System Time'])
@@ -429,16 +425,12 @@ def main():
         print(f'{r.name} resource utilization:', resource_utilization)
     print('-----------')
 
-    # sample entity traces
-    print('Sample entity trace (Entity 30):')
-    for step in entity_traces[30]:
-        print(step)
-    print()
-
-    mid_ind = len(sys_var['entity']['metrics'].keys()) // 2
-    print(f'Sample entity trace (Entity {mid_ind}):')
-    for step in entity_traces[mid_ind]:
-        print(step)
+    # sample entity traces, written with a single print
+    mid_ind = len(sys_var['entity']['metrics']) // 2
+    print('\n\n'.join(
+        f'Sample entity trace (Entity {entity_ind}):\n' + '\n'.join(map(str, entity_traces[entity_ind]))
+        for entity_ind in (30, mid_ind)
+    ))
 
 
 if __name__ == '__main__':
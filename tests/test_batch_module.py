@@ -0,0 +1,54 @@
+from datatypes import BatchType, Entity
+from modules import BatchModule, DisposeModule
+
+
+def _batch_module(batch_size: int) -> BatchModule:
+    return BatchModule(name='Batch', next_module=DisposeModule(name='Dispose'), batch_type=BatchType.ATTRIBUTE,
+                       batch_size=batch_size, batch_attr='color')
+
+
+def _entity(entity_ind: int, **attr) -> Entity:
+    return Entity('Part', float(entity_ind), entity_ind, attr=attr)
+
+
+def _batched_inds(events) -> list:
+    assert len(events) == 1
+    return [e.entity_ind for e, _ in events[0].batch_entities]
+
+
+def test_attribute_batch_takes_oldest_matches_first():
+    module = _batch_module(3)
+    assert module.ingest_entity(_entity(0, color='red'), 0.) == []
+    assert module.ingest_entity(_entity(1, color='blue'), 1.) == []
+    assert module.ingest_entity(_entity(2, color='red'), 2.) == []
+    assert module.queue_length == 3
+
+    # the ingested entity is batched with the two earliest queued matches
+    assert _batched_inds(module.ingest_entity(_entity(3, color='red'), 3.)) == [3, 0, 2]
+    assert module.queue_length == 1
+    assert module.ingest_entity(_entity(4, color='red'), 4.) == []
+    assert module.ingest_entity(_entity(5, color='red'), 5.) == []
+    assert _batched_inds(module.ingest_entity(_entity(6, color='red'), 6.)) == [6, 4, 5]
+    assert module.queue_length == 1
+
+
+def test_attribute_batch_never_batches_entities_missing_attribute():
+    module = _batch_module(2)
+    for entity_ind in range(5):
+        assert module.ingest_entity(_entity(entity_ind), float(entity_ind)) == []
+    assert module.queue_length == 5
+
+    # an entity with the attribute does not match entities missing it
+    assert module.ingest_entity(_entity(5, color='red'), 5.) == []
+    assert module.queue_length == 6
+
+
+def test_attribute_batch_matches_unhashable_values():
+    module = _batch_module(2)
+    assert module.ingest_entity(_entity(0, color=['red', 'blue']), 0.) == []
+    assert module.ingest_entity(_entity(1, color=['red']), 1.) == []
+    assert _batched_inds(module.ingest_entity(_entity(2, color=['red', 'blue']), 2.)) == [2, 0]
+    assert module.queue_length == 1
+
+    module.reset()
+    assert module.queue_length == 0
@@ -0,0 +1,35 @@
+from datatypes import Entity, Resource
+
+
+def _handler(event, sys_var):
+    return []
+
+
+def test_seize_logs_one_entry():
+    resource = Resource('Server', 2)
+    resource.seize(1, 1.5)
+    assert resource.availability_log == [(1.5, 1)]
+
+
+def test_release_logs_one_entry():
+    resource = Resource('Server', 2)
+    resource.seize(2, 1.)
+    assert resource.release(1, 3.) is None
+    assert resource.availability_log == [(1., 0), (3., 1)]
+
+
+def test_release_to_queued_entity_logs_one_combined_entry():
+    resource = Resource('Server', 1)
+    resource.seize(1, 1.)
+    entity = Entity('Part', 0., 0)
+    resource.queue_entity(entity, 1, 2., _handler)
+
+    event = resource.release(1, 5.)
+    assert event is not None
+    assert event.event_entity is entity
+    assert event.event_time == 5.
+    assert event.wait_time == 3.
+    # the release and the queued entity's seize share a single entry at release_time
+    assert resource.availability_log == [(1., 0), (5., 0)]
+    assert resource.available == 0
+    assert not resource.queue